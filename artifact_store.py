@@ -0,0 +1,160 @@
+import os
+import time
+import logging
+import secrets
+import threading
+from journal import Journal
+
+logger = logging.getLogger(__name__)
+
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_RANDOM_BITS = 80
+
+_id_lock = threading.Lock()
+_last_ms = -1
+_last_random = 0
+
+
+def new_id():
+    """
+    Return a new ULID: 48-bit millisecond timestamp plus 80 random bits,
+    as 26 Crockford base32 characters. IDs sort by creation time, and
+    within one millisecond the random part is incremented so they stay
+    unique and ordered without touching the disk.
+    """
+    global _last_ms, _last_random
+    with _id_lock:
+        now_ms = int(time.time() * 1000)
+        if now_ms <= _last_ms:
+            now_ms = _last_ms
+            _last_random += 1
+            if _last_random >= 1 << _RANDOM_BITS:
+                now_ms += 1
+                _last_random = secrets.randbits(_RANDOM_BITS - 1)
+        else:
+            _last_random = secrets.randbits(_RANDOM_BITS - 1)
+        _last_ms = now_ms
+        value = (now_ms << _RANDOM_BITS) | _last_random
+
+    chars = []
+    for _ in range(26):
+        chars.append(_CROCKFORD[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def id_time(artifact_id):
+    """Creation time in seconds encoded in an ID from new_id()"""
+    value = 0
+    for char in artifact_id[:10]:
+        value = value * 32 + _CROCKFORD.index(char)
+    return value / 1000.0
+
+
+def artifact_id(path):
+    """The ID an artifact file was named after, or None for other files"""
+    name = os.path.basename(path or "").split(".", 1)[0]
+    if len(name) == 26 and all(char in _CROCKFORD for char in name):
+        return name
+    return None
+
+
+# The first five characters change every ~9 hours, which keeps each
+# shard directory to a few hundred files at exhibition generation rates
+SHARD_CHARS = 5
+
+_known_dirs = set()
+_dirs_lock = threading.Lock()
+
+
+def artifact_path(root, artifact_id, extension):
+    """Sharded path for an artifact, creating its directory on first use"""
+    directory = os.path.join(root, artifact_id[:SHARD_CHARS])
+    with _dirs_lock:
+        if directory not in _known_dirs:
+            os.makedirs(directory, exist_ok=True)
+            _known_dirs.add(directory)
+    return os.path.join(directory, f"{artifact_id}.{extension}")
+
+
+class ArtifactIndex:
+    """
+    Index of every job's artifacts: transcript and prompt, image path and
+    video path (and their sizes), keyed by job ID. Kept in memory and
+    persisted through a snapshot+journal store.
+    """
+
+    def __init__(self, config):
+        self.lock = threading.Lock()
+        self.records = {}
+        self.subscribers = []
+        self.journal = Journal(
+            config.get('artifact_index_file', 'artifacts.json'),
+            compact_every=config.get('artifact_compact_every', 500),
+            fsync=config.get('queue_fsync', True)
+        )
+        self._load_index()
+
+    def record(self, artifact_id, **fields):
+        """Merge fields into a job's record"""
+        with self.lock:
+            self._apply({"op": "set", "id": artifact_id, "fields": fields})
+
+    def add_file(self, artifact_id, kind, path):
+        """Record an artifact file and its size; kind is e.g. 'image' or 'video'"""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        self.record(artifact_id, **{f"{kind}_path": path, f"{kind}_size": size})
+        for callback in list(self.subscribers):
+            try:
+                callback(artifact_id, kind, path, size)
+            except Exception as e:
+                logger.error(f"Error notifying artifact subscriber: {str(e)}")
+
+    def subscribe(self, callback):
+        """Call callback(artifact_id, kind, path, size) whenever a file is recorded"""
+        self.subscribers.append(callback)
+
+    def get(self, artifact_id):
+        with self.lock:
+            record = self.records.get(artifact_id)
+            return dict(record) if record else None
+
+    def items(self):
+        """Copies of all (artifact_id, record) pairs"""
+        with self.lock:
+            return [(artifact_id, dict(record)) for artifact_id, record in self.records.items()]
+
+    def remove(self, artifact_id):
+        with self.lock:
+            if artifact_id in self.records:
+                self._apply({"op": "remove", "id": artifact_id})
+
+    def _apply(self, record, replay=False):
+        if record["op"] == "set":
+            self.records.setdefault(record["id"], {}).update(record["fields"])
+        elif record["op"] == "remove":
+            self.records.pop(record["id"], None)
+
+        if not replay:
+            self.journal.append(record)
+            if self.journal.should_compact():
+                self._save_index()
+
+    def _load_index(self):
+        try:
+            snapshot, records = self.journal.load(default={})
+            self.records = snapshot or {}
+            for record in records:
+                self._apply(record, replay=True)
+        except Exception as e:
+            logger.error(f"Error loading artifact index: {str(e)}")
+        self._save_index()
+
+    def _save_index(self):
+        try:
+            self.journal.compact(self.records)
+        except Exception as e:
+            logger.error(f"Error saving artifact index: {str(e)}")
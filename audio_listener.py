@@ -1,13 +1,90 @@
-import sounddevice as sd
 import numpy as np
 import wave
 import os
 import logging
 import time
 import sys
+import queue
+import tempfile
+from collections import deque
 
 logger = logging.getLogger(__name__)
 
+# Whisper expects 16 kHz mono float32
+TARGET_SAMPLE_RATE = 16000
+
+
+class StreamResampler:
+    """
+    Resample audio that arrives in blocks: windowed-sinc low-pass followed
+    by linear interpolation onto the new rate. Keeps just enough history
+    for the filter so block boundaries don't click.
+    """
+
+    HALF_TAPS = 32
+
+    def __init__(self, src_rate, dst_rate=TARGET_SAMPLE_RATE):
+        self.step = src_rate / dst_rate
+        if dst_rate < src_rate:
+            # Anti-aliasing filter at the new Nyquist frequency
+            cutoff = 0.5 * dst_rate / src_rate
+            taps = np.arange(-self.HALF_TAPS, self.HALF_TAPS + 1)
+            kernel = 2 * cutoff * np.sinc(2 * cutoff * taps) * np.hamming(len(taps))
+            self.kernel = (kernel / kernel.sum()).astype(np.float32)
+        else:
+            self.kernel = np.zeros(2 * self.HALF_TAPS + 1, dtype=np.float32)
+            self.kernel[self.HALF_TAPS] = 1.0
+        # Leading zeros give the first samples a full filter window
+        self.history = np.zeros(self.HALF_TAPS, dtype=np.float32)
+        self.history_start = -self.HALF_TAPS
+        self.next_out = 0
+        self.total_in = 0
+
+    def push(self, samples):
+        """Add input samples and return every output sample now computable"""
+        self.total_in += len(samples)
+        self.history = np.concatenate([self.history, samples.astype(np.float32, copy=False)])
+        if len(self.history) < len(self.kernel) + 1:
+            return np.zeros(0, dtype=np.float32)
+
+        # filtered[j] is the low-passed input sample at history_start + HALF_TAPS + j
+        filtered = np.convolve(self.history, self.kernel, mode='valid')
+        first = self.history_start + self.HALF_TAPS
+        last = first + len(filtered) - 1
+
+        end = int((last - 1) // self.step) + 1
+        end = min(end, int(round(self.total_in / self.step)))
+        if end <= self.next_out:
+            return np.zeros(0, dtype=np.float32)
+
+        positions = np.arange(self.next_out, end) * self.step - first
+        out = np.interp(positions, np.arange(len(filtered)), filtered).astype(np.float32)
+        self.next_out = end
+
+        # Drop history the next output sample no longer needs
+        keep_from = int(self.next_out * self.step) - self.HALF_TAPS
+        drop = max(0, keep_from - self.history_start)
+        if drop:
+            self.history = self.history[drop:]
+            self.history_start += drop
+        return out
+
+    def flush(self):
+        """Return the remaining output once the input has ended"""
+        total_in = self.total_in
+        out = self.push(np.zeros(self.HALF_TAPS + 1, dtype=np.float32))
+        self.total_in = total_in
+        return out
+
+
+def resample(audio, src_rate, dst_rate=TARGET_SAMPLE_RATE):
+    """Resample a whole clip in one go"""
+    if src_rate == dst_rate or len(audio) == 0:
+        return audio.astype(np.float32, copy=False)
+    resampler = StreamResampler(src_rate, dst_rate)
+    return np.concatenate([resampler.push(audio), resampler.flush()])
+
+
 class AudioListener:
     def __init__(self, config):
         self.device_index = config.get('audio_device_index', 0)
@@ -16,7 +93,28 @@ class AudioListener:
         self.chunk_size = config.get('chunk_size', 1024)
         self.record_seconds = config.get('record_seconds', 10)  # Increased to 10 seconds
 
+        # Streaming capture with energy-based endpointing
+        self.capture_mode = config.get('capture_mode', 'fixed')
+        self.vad_threshold = config.get('vad_threshold', 0.02)
+        self.vad_noise_ratio = config.get('vad_noise_ratio', 3.0)
+        self.vad_onset_seconds = config.get('vad_onset_seconds', 0.15)
+        self.vad_silence_seconds = config.get('vad_silence_seconds', 0.8)
+        self.vad_preroll_seconds = config.get('vad_preroll_seconds', 0.3)
+        self.vad_min_speech_seconds = config.get('vad_min_speech_seconds', 0.4)
+        self.vad_max_seconds = config.get('vad_max_seconds', 15)
+        self.vad_listen_timeout = config.get('vad_listen_timeout', 30)
+        self.noise_floor = None
+
+        # 'memory' returns a 16 kHz float32 buffer, 'file' writes a WAV for debugging
+        self.audio_handoff = config.get('audio_handoff', 'memory')
+
     def record(self):
+        """Record one utterance using the configured capture mode"""
+        if self.capture_mode == 'vad':
+            return self.record_utterance()
+        return self.record_fixed()
+
+    def record_fixed(self):
         """Record audio from microphone with countdown"""
         logger.info("Recording audio...")
         print("\nRecording starts in:")
@@ -27,6 +125,8 @@ class AudioListener:
         print(f"\nRecording... ({self.record_seconds} seconds)")
         print("Speak your description (time remaining: ", end='', flush=True)
         
+        import sounddevice as sd
+
         try:
             # Calculate total frames
             frames = int(self.sample_rate * self.record_seconds)
@@ -50,30 +150,192 @@ class AudioListener:
             # Wait for recording to finish
             sd.wait()
             
-            # Save recording temporarily
-            temp_file = "temp_recording.wav"
-            with wave.open(temp_file, 'wb') as wf:
-                wf.setnchannels(self.channels)
-                wf.setsampwidth(2)  # 2 bytes for int16
-                wf.setframerate(self.sample_rate)
-                wf.writeframes(recording.tobytes())
-            
             logger.info("Audio recording completed")
-            return temp_file
+            return self._finish_recording(recording)
             
         except Exception as e:
             logger.error(f"Error recording audio: {str(e)}")
             return None
 
+    def record_utterance(self):
+        """
+        Stream from the microphone and return one utterance, starting at
+        speech onset and ending after a tail of silence. Returns None if
+        nobody spoke within the listen timeout.
+        """
+        utterance = list(self._utterance_blocks())
+        if not utterance:
+            return None
+
+        print("Processing...")
+        logger.info("Audio recording completed")
+        return self._finish_recording(np.concatenate(utterance))
+
+    def stream_utterance(self):
+        """
+        Like record_utterance, but yield 16 kHz mono float32 chunks while
+        the visitor is still speaking. Yields nothing if nobody spoke.
+        """
+        resampler = None
+        for block in self._utterance_blocks():
+            if resampler is None:
+                resampler = StreamResampler(self.sample_rate)
+            chunk = resampler.push(self._to_mono_float(block))
+            if len(chunk):
+                yield chunk
+
+        if resampler is not None:
+            print("Processing...")
+            logger.info("Audio recording completed")
+            yield resampler.flush()
+
+    def _utterance_blocks(self):
+        """
+        Yield raw int16 blocks of one utterance as they are captured.
+
+        Nothing is yielded until the utterance holds enough speech to be
+        worth transcribing, and silent blocks are held back until speech
+        resumes, so the silence tail and empty recordings are dropped.
+        """
+        import sounddevice as sd
+
+        blocks = queue.Queue()
+
+        def callback(indata, frames, time_info, status):
+            if status:
+                logger.debug(f"Input stream status: {status}")
+            blocks.put(indata.copy())
+
+        block_seconds = self.chunk_size / self.sample_rate
+        onset_blocks = max(1, round(self.vad_onset_seconds / block_seconds))
+        silence_blocks = max(1, round(self.vad_silence_seconds / block_seconds))
+        min_speech_blocks = max(1, round(self.vad_min_speech_seconds / block_seconds))
+        preroll = deque(maxlen=max(1, round(self.vad_preroll_seconds / block_seconds)))
+        max_blocks = int(self.vad_max_seconds / block_seconds)
+        timeout_blocks = int(self.vad_listen_timeout / block_seconds)
+
+        pending = []
+        started = False
+        confirmed = False
+        voiced_run = 0
+        silent_run = 0
+        speech_blocks = 0
+        total_blocks = 0
+        waited = 0
+
+        try:
+            with sd.InputStream(
+                samplerate=self.sample_rate,
+                channels=self.channels,
+                dtype=np.int16,
+                blocksize=self.chunk_size,
+                device=self.device_index,
+                callback=callback
+            ):
+                print("\nSpeak your description...")
+                while True:
+                    block = blocks.get(timeout=max(1.0, block_seconds * 10))
+                    voiced = self._is_speech(block)
+
+                    if not started:
+                        # Waiting for onset: require a short run of voiced
+                        # blocks so clicks and bumps don't start an utterance
+                        preroll.append(block)
+                        voiced_run = voiced_run + 1 if voiced else 0
+                        if voiced_run >= onset_blocks:
+                            started = True
+                            pending.extend(preroll)
+                            total_blocks = len(pending)
+                            speech_blocks = voiced_run
+                            print("Listening...")
+                        else:
+                            waited += 1
+                            if waited >= timeout_blocks:
+                                return
+                            continue
+                    else:
+                        pending.append(block)
+                        total_blocks += 1
+                        if voiced:
+                            speech_blocks += 1
+                            silent_run = 0
+                        else:
+                            silent_run += 1
+
+                    if silent_run >= silence_blocks or total_blocks >= max_blocks:
+                        break
+
+                    if not confirmed and speech_blocks >= min_speech_blocks:
+                        confirmed = True
+                    if confirmed and not silent_run:
+                        yield from pending
+                        pending = []
+
+        except Exception as e:
+            logger.error(f"Error recording audio: {str(e)}")
+            return
+
+        if not confirmed:
+            # Drop utterances that never contained enough speech to transcribe
+            logger.info("Discarding utterance with too little speech")
+            return
+
+        # Trim the silence tail, it only costs Whisper time
+        if silent_run:
+            pending = pending[:-silent_run]
+        yield from pending
+
+    def _is_speech(self, block):
+        """Energy detector with a slowly adapting noise floor"""
+        rms = float(np.sqrt(np.mean(np.square(block.astype(np.float32) / 32768.0))))
+        if self.noise_floor is None:
+            self.noise_floor = min(rms, self.vad_threshold)
+        threshold = max(self.vad_threshold, self.noise_floor * self.vad_noise_ratio)
+        voiced = rms >= threshold
+        if not voiced:
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * rms
+        return voiced
+
+    def _finish_recording(self, recording):
+        """Hand the recording to the transcriber in the configured form"""
+        if self.audio_handoff == 'file':
+            return self._save_recording(recording)
+        return self.to_transcriber_audio(recording)
+
+    def to_transcriber_audio(self, recording):
+        """Convert int16 samples at the capture rate to 16 kHz mono float32"""
+        return resample(self._to_mono_float(recording), self.sample_rate)
+
+    def _to_mono_float(self, recording):
+        audio = recording.astype(np.float32) / 32768.0
+        if audio.ndim > 1:
+            audio = audio.mean(axis=1)
+        return audio
+
+    def _save_recording(self, recording):
+        """Save recording temporarily and return its path"""
+        # The name is unique because the transcriber may still be working
+        # on the previous recording
+        fd, temp_file = tempfile.mkstemp(prefix="temp_recording_", suffix=".wav")
+        os.close(fd)
+        with wave.open(temp_file, 'wb') as wf:
+            wf.setnchannels(self.channels)
+            wf.setsampwidth(2)  # 2 bytes for int16
+            wf.setframerate(self.sample_rate)
+            wf.writeframes(recording.tobytes())
+        return temp_file
+
     def list_devices(self):
         """List available audio devices"""
+        import sounddevice as sd
+
         return sd.query_devices()
 
     def test_audio(self):
         """Test audio recording"""
         print("Recording test audio...")
         recording = self.record()
-        if recording:
+        if recording is not None:
             print("Recording successful!")
             return True
         return False
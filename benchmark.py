@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Runs the full FieldOfVision pipeline offline against local DALL-E and
+Runway stand-ins, a fake microphone and the stub transcriber, then
+prints per-span latency percentiles, visitors per hour and peak memory
+as JSON.
+
+    python benchmark.py --visitors 20 --interval 2 --video-latency 10 --output bench.json
+"""
+import os
+import sys
+import json
+import time
+import wave
+import shutil
+import random
+import argparse
+import resource
+import tempfile
+import threading
+import contextlib
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SCENES = [
+    "misty mountains at dusk",
+    "a forest with sunlight shining through the trees",
+    "a quiet lake at dawn with fog",
+    "a stormy ocean at night with lightning",
+    "golden wheat fields at sunset",
+    "a waterfall in a lush green jungle",
+    "snowy peaks under the northern lights",
+    "a desert with rolling dunes at noon",
+    "an ancient forest in the rain",
+    "a calm river through autumn hills",
+]
+
+
+class FakeAudioListener:
+    """Stands in for AudioListener: each record() waits for the next visitor and returns their audio"""
+
+    capture_mode = 'fixed'
+
+    def __init__(self, visitors, interval, utterance_seconds, wav_files=None, seed=None):
+        self.remaining = visitors
+        self.interval = interval
+        self.random = random.Random(seed)
+        self.clips = [self._load_wav(path) for path in wav_files or []]
+        self.utterance_seconds = utterance_seconds
+
+    def record(self):
+        if self.remaining <= 0:
+            return None
+        self.remaining -= 1
+        # Visitors arrive as a Poisson process
+        if self.interval:
+            time.sleep(self.random.expovariate(1.0 / self.interval))
+        if self.clips:
+            return self.clips[self.remaining % len(self.clips)]
+        return self._synthetic()
+
+    def _synthetic(self):
+        """Voice-like harmonics under a syllable-rate envelope, with a little noise"""
+        from transcription_backends import SAMPLE_RATE
+
+        t = np.arange(int(self.utterance_seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        pitch = self.random.uniform(110, 220)
+        voice = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 5))
+        envelope = 0.5 * (1 + np.sin(2 * np.pi * 4 * t))
+        noise = np.random.default_rng(self.random.randrange(1 << 30)).normal(0, 0.01, len(t))
+        return (0.2 * voice * envelope + noise).astype(np.float32)
+
+    @staticmethod
+    def _load_wav(path):
+        from audio_listener import resample
+
+        with wave.open(path, 'rb') as f:
+            width = f.getsampwidth()
+            channels = f.getnchannels()
+            rate = f.getframerate()
+            frames = f.readframes(f.getnframes())
+        if width != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV files are supported")
+        audio = np.frombuffer(frames, dtype=np.int16).reshape(-1, channels).mean(axis=1) / 32768.0
+        return resample(audio.astype(np.float32), rate)
+
+
+class HeadlessPlayer:
+    """Stands in for VideoPlayer: shows each new clip the moment it is queued"""
+
+    def __init__(self, config, queue_manager):
+        from video_player import VideoPlayer
+
+        self.queue_manager = queue_manager
+        self.playing_fresh = False
+        self.max_display_latency = config.get('max_display_latency', 30)
+        self.display_latencies = []
+        self.lock = threading.Lock()
+        self.clip_started = VideoPlayer._clip_started.__get__(self)
+        queue_manager.subscribe(self._on_new_video)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def _on_new_video(self, video_path):
+        with self.lock:
+            while self.queue_manager.get_queue_length():
+                self.clip_started(self.queue_manager.get_next_video())
+
+
+def build_config(args, workdir):
+    with open(os.path.join(REPO_DIR, 'config.json'), 'r') as f:
+        config = json.load(f)
+
+    config.update({
+        'video_queue_file': os.path.join(workdir, 'playlist.json'),
+        'video_catalog_file': os.path.join(workdir, 'video_catalog.json'),
+        'artifact_index_file': os.path.join(workdir, 'artifacts.json'),
+        'startup_log_file': None,
+        'queue_fsync': not args.no_fsync,
+        'capture_mode': 'fixed',
+        'transcribe_mode': 'batch',
+        'audio_handoff': 'memory',
+        'transcriber': {'backend': 'stub', 'stub_texts': SCENES, 'warmup': False},
+        'metrics': {'trace_file': os.path.join(workdir, 'traces.jsonl')},
+    })
+    config['runway'] = dict(
+        config.get('runway', {}),
+        task_file=os.path.join(workdir, 'runway_tasks.json'),
+        first_poll_seconds=min(config.get('runway', {}).get('first_poll_seconds', 5), args.video_latency / 2 or 0.1),
+        min_poll_seconds=0.2
+    )
+    config['result_cache'] = dict(
+        config.get('result_cache', {}),
+        enabled=args.cache,
+        cache_file=os.path.join(workdir, 'result_cache.json')
+    )
+    # Every visitor gets one of a handful of scenes, so repeats are expected
+    config['prompt_gate'] = dict(config.get('prompt_gate', {}), max_repeats=args.visitors + 1)
+    config['speculative'] = dict(config.get('speculative', {}), enabled=False)
+    config['local_video'] = dict(config.get('local_video', {}), enabled=args.local_fallback, placeholder=False)
+    # The mock serves placeholder bytes, not a playable MP4, so ffprobe would reject every clip
+    config['transcode'] = dict(config.get('transcode', {}), enabled=False)
+    return config
+
+
+def percentiles(values):
+    if not values:
+        return None
+    values = np.asarray(values)
+    return {
+        'count': int(len(values)),
+        'p50': round(float(np.percentile(values, 50)), 4),
+        'p95': round(float(np.percentile(values, 95)), 4),
+        'p99': round(float(np.percentile(values, 99)), 4),
+        'max': round(float(values.max()), 4),
+    }
+
+
+def summarize(trace_file, wall_seconds, visitors, mock):
+    spans = {}
+    time_to_screen = []
+    finished = set()
+    displayed = 0
+    with open(trace_file, 'r') as f:
+        for line in f:
+            record = json.loads(line)
+            name = record['name']
+            if 'seconds' in record:
+                spans.setdefault(name, []).append(record['seconds'])
+            if name == 'first_display' and record.get('job_id'):
+                # The ID is the clip's, so a cache hit shows up again under
+                # the job that generated it; only that job's time is known
+                displayed += 1
+                if record['job_id'] not in finished:
+                    from artifact_store import id_time
+                    time_to_screen.append(record['start'] - id_time(record['job_id']))
+                    finished.add(record['job_id'])
+
+    return {
+        'visitors': visitors,
+        'displayed': displayed,
+        'wall_seconds': round(wall_seconds, 3),
+        'visitors_per_hour': round(displayed / wall_seconds * 3600, 1) if wall_seconds else 0.0,
+        'time_to_screen': percentiles(time_to_screen),
+        'spans': {name: percentiles(values) for name, values in sorted(spans.items())},
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'mock_api': mock.stats(),
+    }
+
+
+def jobs_finished(metrics):
+    """Jobs that reached the last stage or were dropped along the way"""
+    done = 0
+    with metrics.lock:
+        for (name, labels), value in metrics.counters.items():
+            labels = dict(labels)
+            if name == 'fov_spans_total' and (labels['status'] == 'dropped' or labels['span'] == 'enqueue'):
+                done += value
+    return done
+
+
+def run(args):
+    from mock_apis import MockAPIServer
+
+    mock = MockAPIServer(
+        image_latency=args.image_latency,
+        video_latency=args.video_latency,
+        jitter=args.jitter,
+        failure_rate=args.failure_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        seed=args.seed
+    ).start()
+
+    workdir = tempfile.mkdtemp(prefix='fov_bench_')
+    config = build_config(args, workdir)
+    with open(os.path.join(workdir, 'config.json'), 'w') as f:
+        json.dump(config, f)
+    shutil.copy(os.path.join(REPO_DIR, 'vocabulary.json'), workdir)
+
+    os.environ.update({
+        'OPENAI_API_KEY': 'benchmark',
+        'RUNWAY_API_SECRET': 'benchmark',
+        'OPENAI_API_BASE': mock.api_base,
+        'RUNWAY_API_BASE': mock.api_base,
+        'SAVE_DIRECTORY': os.path.join(workdir, 'generated'),
+    })
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+
+    try:
+        import main
+
+        class BenchmarkApp(main.FieldOfVision):
+            def _create_player(self):
+                return HeadlessPlayer(self.config, self.queue_manager)
+
+            def _create_audio_listener(self):
+                return FakeAudioListener(
+                    args.visitors, args.interval, args.utterance_seconds, args.wav, seed=args.seed
+                )
+
+        # The app's progress prints go to stderr so stdout is only the report
+        with contextlib.redirect_stdout(sys.stderr):
+            app = BenchmarkApp()
+            app.pipeline.start()
+            started = time.time()
+            submitted = 0
+            for _ in range(args.visitors):
+                job = app._capture()
+                if job is not None:
+                    app.pipeline.submit(job)
+                    submitted += 1
+
+            deadline = time.time() + args.timeout
+            while jobs_finished(app.metrics) < submitted and time.time() < deadline:
+                time.sleep(0.1)
+            wall_seconds = time.time() - started
+
+            app.cleanup()
+
+        report = summarize(config['metrics']['trace_file'], wall_seconds, args.visitors, mock)
+        report['submitted'] = submitted
+        report['timed_out'] = jobs_finished(app.metrics) < submitted
+        report['settings'] = {key: value for key, value in vars(args).items() if key != 'output'}
+        return report
+    finally:
+        os.chdir(cwd)
+        mock.stop()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark for Field of Vision")
+    parser.add_argument('--visitors', type=int, default=10, help="utterances to feed in")
+    parser.add_argument('--interval', type=float, default=1.0, help="mean seconds between visitors")
+    parser.add_argument('--utterance-seconds', type=float, default=4.0, help="length of synthetic audio")
+    parser.add_argument('--wav', action='append', help="16-bit PCM WAV file to use as audio; repeatable")
+    parser.add_argument('--image-latency', type=float, default=1.0, help="mock DALL-E seconds per image")
+    parser.add_argument('--video-latency', type=float, default=5.0, help="mock Runway seconds per task")
+    parser.add_argument('--jitter', type=float, default=0.2, help="+/- fraction applied to mock latencies")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="fraction of mock requests that fail")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="fraction of mock requests answered 429")
+    parser.add_argument('--retry-after', type=float, default=1, help="Retry-After seconds on mock 429s")
+    parser.add_argument('--cache', action='store_true', help="enable the prompt result cache")
+    parser.add_argument('--local-fallback', action='store_true', help="render local clips when Runway fails")
+    parser.add_argument('--no-fsync', action='store_true', help="skip fsync in the journals")
+    parser.add_argument('--min-displayed', type=int,
+                        help="fail unless at least this many jobs reach the screen; default all submitted")
+    parser.add_argument('--timeout', type=float, default=600, help="seconds to wait for jobs to finish")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--keep', action='store_true', help="keep the temporary working directory")
+    parser.add_argument('--output', help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    print(text)
+    # Jobs dropped along the way count as finished, so check how many were shown
+    min_displayed = report['submitted'] if args.min_displayed is None else args.min_displayed
+    if report['timed_out'] or report['displayed'] < min_displayed:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+import logging
+import threading
+import time
+import queue
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_END = -1
+
+
+class FrameRing:
+    """
+    Bounded ring of preallocated frame buffers passed between one decoder
+    and one presenter. Only slot indices move through the queues, so no
+    frame is copied or allocated while playing.
+    """
+
+    def __init__(self, size, shape):
+        self.frames = [np.empty(shape, dtype=np.uint8) for _ in range(size)]
+        self.timestamps = [0.0] * size
+        self.free = queue.Queue()
+        self.ready = queue.Queue()
+        for index in range(size):
+            self.free.put(index)
+
+    def acquire(self, timeout=None):
+        """Get a free slot for the decoder to fill"""
+        return self.free.get(timeout=timeout)
+
+    def publish(self, index, timestamp):
+        self.timestamps[index] = timestamp
+        self.ready.put(index)
+
+    def finish(self):
+        """Tell the presenter there are no more frames"""
+        self.ready.put(_END)
+
+    def next_frame(self, timeout=None):
+        """Get the next decoded slot, or _END"""
+        return self.ready.get(timeout=timeout)
+
+    def release(self, index):
+        self.free.put(index)
+
+
+class FrameTimings:
+    """Running averages for decode and present times"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.decode_ms = 0.0
+        self.present_ms = 0.0
+        self.fps = 0.0
+        self.frames = 0
+        self.dropped = 0
+        self.duplicated = 0
+        self.last_present = None
+
+    def record_decode(self, seconds):
+        with self.lock:
+            self.decode_ms = self._average(self.decode_ms, seconds * 1000)
+
+    def record_present(self, seconds, now):
+        with self.lock:
+            self.present_ms = self._average(self.present_ms, seconds * 1000)
+            if self.last_present is not None and now > self.last_present:
+                self.fps = self._average(self.fps, 1.0 / (now - self.last_present))
+            self.last_present = now
+            self.frames += 1
+
+    def record_dropped(self):
+        with self.lock:
+            self.dropped += 1
+
+    def record_duplicated(self):
+        with self.lock:
+            self.duplicated += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "decode_ms": round(self.decode_ms, 2),
+                "present_ms": round(self.present_ms, 2),
+                "fps": round(self.fps, 1),
+                "frames": self.frames,
+                "dropped": self.dropped,
+                "duplicated": self.duplicated
+            }
+
+    @staticmethod
+    def _average(current, value, weight=0.1):
+        return value if current == 0.0 else current + weight * (value - current)
+
+
+class FramePlayer:
+    """
+    Plays a clip on a pygame surface: a decoder thread decodes with OpenCV
+    and scales straight into a ring slot, and the presenter shows each
+    frame at its timestamp. Late frames are dropped; if the decoder falls
+    behind, the last frame stays on screen and is counted as duplicated.
+    """
+
+    def __init__(self, screen, buffer_frames=8):
+        self.screen = screen
+        self.size = screen.get_size()
+        width, height = self.size
+        self.ring = FrameRing(buffer_frames, (height, width, 3))
+        self.timings = FrameTimings()
+
+    def play(self, video_path, should_stop=None):
+        """Play one clip; returns True at its end, False if stopped, None if it can't be opened"""
+        import cv2
+        import pygame
+
+        capture = cv2.VideoCapture(video_path)
+        if not capture.isOpened():
+            logger.error(f"Could not open video: {video_path}")
+            return None
+
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        frame_duration = 1.0 / fps
+        stop = threading.Event()
+        decoder = threading.Thread(
+            target=self._decode,
+            args=(capture, frame_duration, stop),
+            name="frame-decoder",
+            daemon=True
+        )
+        decoder.start()
+
+        completed = True
+        start = None
+        try:
+            while True:
+                if should_stop and should_stop():
+                    completed = False
+                    break
+
+                try:
+                    index = self.ring.next_frame(timeout=frame_duration)
+                except queue.Empty:
+                    # Decoder is behind: the previous frame stays up
+                    self.timings.record_duplicated()
+                    pygame.event.pump()
+                    continue
+                if index == _END:
+                    break
+
+                timestamp = self.ring.timestamps[index]
+                now = time.perf_counter()
+                if start is None:
+                    start = now - timestamp
+                due = start + timestamp
+
+                if now > due + frame_duration:
+                    # Too late to be worth showing
+                    self.timings.record_dropped()
+                    self.ring.release(index)
+                    continue
+                if due > now:
+                    time.sleep(due - now)
+
+                presented = time.perf_counter()
+                surface = pygame.image.frombuffer(self.ring.frames[index], self.size, 'RGB')
+                self.screen.blit(surface, (0, 0))
+                pygame.display.flip()
+                pygame.event.pump()
+                done = time.perf_counter()
+                self.timings.record_present(done - presented, done)
+                self.ring.release(index)
+        finally:
+            stop.set()
+            self._drain(decoder)
+            capture.release()
+
+        return completed
+
+    def _decode(self, capture, frame_duration, stop):
+        """Decode frames into free ring slots until the clip ends or playback stops"""
+        import cv2
+
+        width, height = self.size
+        decoded = None
+        frame_number = 0
+        try:
+            while not stop.is_set():
+                started = time.perf_counter()
+                ok, decoded = capture.read(decoded)
+                if not ok:
+                    break
+                decode_time = time.perf_counter() - started
+
+                index = None
+                while index is None and not stop.is_set():
+                    try:
+                        index = self.ring.acquire(timeout=0.1)
+                    except queue.Empty:
+                        pass
+                if index is None:
+                    break
+
+                # Scale once, straight into the ring slot, then swap channels in place
+                started = time.perf_counter()
+                frame = self.ring.frames[index]
+                if decoded.shape[1] == width and decoded.shape[0] == height:
+                    cv2.cvtColor(decoded, cv2.COLOR_BGR2RGB, dst=frame)
+                else:
+                    cv2.resize(decoded, (width, height), dst=frame, interpolation=cv2.INTER_LINEAR)
+                    cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame)
+
+                self.timings.record_decode(decode_time + time.perf_counter() - started)
+                self.ring.publish(index, frame_number * frame_duration)
+                frame_number += 1
+        except Exception as e:
+            logger.error(f"Frame decoding error: {str(e)}")
+        finally:
+            self.ring.finish()
+
+    def _drain(self, decoder):
+        """Return every slot to the free list once the decoder has exited"""
+        while decoder.is_alive():
+            try:
+                index = self.ring.next_frame(timeout=0.1)
+                if index != _END:
+                    self.ring.release(index)
+            except queue.Empty:
+                pass
+        while True:
+            try:
+                index = self.ring.next_frame(timeout=0)
+            except queue.Empty:
+                break
+            if index != _END:
+                self.ring.release(index)
@@ -0,0 +1,191 @@
+import os
+import time
+import random
+import hashlib
+import logging
+import tempfile
+import threading
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+def _failed_to_connect(error):
+    """Whether a ConnectionError happened before any of the request was sent"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = error.args[0] if error.args else None
+    if isinstance(reason, MaxRetryError):
+        reason = reason.reason
+    return isinstance(reason, NewConnectionError)
+
+
+class HttpClient:
+    """
+    Shared HTTP client for the API integrations: one keep-alive session
+    with a connection pool, default connect/read timeouts, and retries with
+    exponential backoff, full jitter and Retry-After support.
+
+    POSTs are only retried on 429 or when the connection could not be
+    made (refused, unresolvable or timed out), since a 5xx or a reset
+    after the request was sent may already have started a paid job.
+    """
+
+    def __init__(self, pool_size=10, connect_timeout=5, read_timeout=60,
+                 max_retries=4, backoff=0.5, max_backoff=30):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method, url, timeout=None, retry_unsafe=False, **kwargs):
+        """Send a request, retrying transient failures"""
+        method = method.upper()
+        retry_any = method in IDEMPOTENT_METHODS or retry_unsafe
+        timeout = timeout or (self.connect_timeout, self.read_timeout)
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                # A failed connect never reached the server, so it is safe to retry
+                if last_attempt or not (retry_any or _failed_to_connect(e)):
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"{method} {url} failed ({str(e)}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            except requests.exceptions.Timeout as e:
+                if last_attempt or not retry_any:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"{method} {url} timed out, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            status = response.status_code
+            if last_attempt or status not in RETRY_STATUSES or not (retry_any or status == 429):
+                return response
+
+            delay = self._retry_after(response)
+            if delay is None:
+                delay = self._backoff(attempt)
+            logger.warning(f"{method} {url} returned {status}, retrying in {delay:.1f}s")
+            response.close()
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def download(self, url, dest_path, expected_size=None, expected_sha256=None,
+                 chunk_size=1 << 16, timeout=None):
+        """
+        Stream a URL to a temp file next to dest_path and rename it into
+        place, so readers never see a partial file. The size is checked
+        against Content-Length (or expected_size) and, if given, the
+        SHA-256 digest. Returns the number of bytes written.
+        """
+        response = self.get(url, stream=True, timeout=timeout)
+        try:
+            response.raise_for_status()
+            if expected_size is None and response.headers.get("Content-Length"):
+                if "Content-Encoding" not in response.headers:
+                    expected_size = int(response.headers["Content-Length"])
+
+            directory = os.path.dirname(os.path.abspath(dest_path))
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".part_")
+            try:
+                digest = hashlib.sha256()
+                size = 0
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                if expected_size is not None and size != expected_size:
+                    raise IOError(f"Incomplete download: got {size} of {expected_size} bytes")
+                if expected_sha256 and digest.hexdigest() != expected_sha256.lower():
+                    raise IOError("Downloaded file failed SHA-256 verification")
+
+                os.replace(temp_path, dest_path)
+                return size
+            except Exception:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+                raise
+        finally:
+            response.close()
+
+    def close(self):
+        self.session.close()
+
+    def _backoff(self, attempt):
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def _retry_after(self, response):
+        """Seconds requested by a Retry-After header, capped at max_backoff"""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return min(max(delay, 0.0), self.max_backoff)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def configure(settings):
+    """Replace the shared client using the 'http' config section"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = HttpClient(**settings)
+        return _client
+
+
+def close():
+    """Close the shared client's connection pool"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def get_client():
+    """Return the shared client, creating one with defaults on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -1,9 +1,10 @@
 import os
 import logging
-import requests
-from PIL import Image
-from io import BytesIO
 from dotenv import load_dotenv
+from http_client import get_client
+from artifact_store import artifact_path, new_id
+from keyword_matcher import KeywordMatcher, load_vocabulary
+from metrics import get_metrics
 
 logger = logging.getLogger(__name__)
 load_dotenv()
@@ -11,28 +12,20 @@ load_dotenv()
 class ImageGenerator:
     def __init__(self):
         self.api_key = os.getenv("OPENAI_API_KEY")
+        self.api_base = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
         self.save_dir = os.getenv("SAVE_DIRECTORY", "./generated_images")
         os.makedirs(self.save_dir, exist_ok=True)
 
+        # Literal descriptions mapped to atmospheric ones, from vocabulary.json
+        self.atmospheric_matcher = KeywordMatcher(load_vocabulary().get('atmospheric', {}))
+
     def _enhance_prompt(self, prompt):
         """Transform literal descriptions into more atmospheric ones"""
         # Convert literal descriptions to atmospheric ones
         prompt = prompt.lower()
         
-        atmospheric_mappings = {
-            "wall of trees": "dense forest canopy",
-            "sunlight shining through": "ethereal sunbeams filtering through the trees",
-            "light through": "golden light streaming through",
-            "wall of": "dense, majestic",
-            "shining": "radiating",
-            "beam": "ray of light",
-            "beams": "rays of light"
-        }
-        
-        # Apply mappings
-        enhanced = prompt
-        for literal, atmospheric in atmospheric_mappings.items():
-            enhanced = enhanced.replace(literal, atmospheric)
+        # Apply mappings in one pass, longest phrase first
+        enhanced = self.atmospheric_matcher.replace(prompt)
         
         # Add artistic and atmospheric qualities, explicitly prevent UI/text
         enhanced = (
@@ -45,8 +38,8 @@ class ImageGenerator:
         
         return enhanced
 
-    def generate(self, prompt):
-        """Generate image using DALL-E API"""
+    def generate(self, prompt, artifact_id=None):
+        """Generate image using DALL-E API; artifact_id names the saved file"""
         try:
             print("Generating image with DALL-E...")
             
@@ -54,33 +47,33 @@ class ImageGenerator:
             enhanced_prompt = self._enhance_prompt(prompt)
             print(f"Enhanced prompt: {enhanced_prompt}")
             
-            response = requests.post(
-                "https://api.openai.com/v1/images/generations",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "prompt": enhanced_prompt,
-                    "n": 1,
-                    "size": "1024x1024",
-                    "model": "dall-e-3",
-                    "quality": "hd",
-                    "style": "natural",  # Ensure natural photographic style
-                }
-            )
-            
-            response.raise_for_status()
+            http = get_client()
+            metrics = get_metrics()
+            with metrics.span('dalle_request', artifact_id):
+                response = http.post(
+                    f"{self.api_base}/images/generations",
+                    headers={
+                        "Authorization": f"Bearer {self.api_key}",
+                        "Content-Type": "application/json"
+                    },
+                    json={
+                        "prompt": enhanced_prompt,
+                        "n": 1,
+                        "size": "1024x1024",
+                        "model": "dall-e-3",
+                        "quality": "hd",
+                        "style": "natural",  # Ensure natural photographic style
+                    },
+                    timeout=(http.connect_timeout, 120)
+                )
+                response.raise_for_status()
             image_url = response.json()["data"][0]["url"]
             print("Image generated, downloading...")
             
-            # Download image
-            image_response = requests.get(image_url)
-            image = Image.open(BytesIO(image_response.content))
-            
-            # Save image
-            save_path = os.path.join(self.save_dir, f"generated_{len(os.listdir(self.save_dir))}.png")
-            image.save(save_path)
+            # Stream the original PNG bytes straight to disk
+            save_path = artifact_path(self.save_dir, artifact_id or new_id(), "png")
+            with metrics.span('image_download', artifact_id) as span:
+                span['bytes'] = http.download(image_url, save_path)
             print(f"Image saved: {save_path}")
             
             return save_path
@@ -0,0 +1,105 @@
+import json
+import os
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+
+def atomic_write_json(path, data):
+    """Write JSON to a temp file in the same directory, fsync it and rename it into place"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".json")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except Exception:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class Journal:
+    """
+    Crash-safe persistence for an in-memory structure: a JSON snapshot plus
+    an append-only JSONL journal of changes made since the snapshot.
+
+    Each change is one appended line, so a crash can at worst lose a torn
+    final line, which is skipped on replay. compact() writes a fresh
+    snapshot atomically and empties the journal. Records carry a sequence
+    number and the snapshot stores the last one it includes, so a crash
+    between those two steps doesn't replay changes twice.
+    """
+
+    def __init__(self, snapshot_path, compact_every=500, fsync=True):
+        self.snapshot_path = snapshot_path
+        self.journal_path = f"{snapshot_path}.journal"
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.pending = 0
+        self.seq = 0
+        self.file = None
+
+    def load(self, default=None):
+        """Return (snapshot, records) from disk"""
+        snapshot = default
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, 'r') as f:
+                    stored = json.load(f)
+                if isinstance(stored, dict) and 'seq' in stored and 'data' in stored:
+                    self.seq = stored['seq']
+                    snapshot = stored['data']
+                else:
+                    # Plain JSON written before the journal existed
+                    snapshot = stored
+            except Exception as e:
+                logger.error(f"Error loading snapshot {self.snapshot_path}: {str(e)}")
+
+        records = []
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        logger.warning(f"Skipping torn journal record in {self.journal_path}")
+                        continue
+                    seq = record.pop('seq', 0)
+                    if seq > self.seq:
+                        records.append(record)
+                        self.seq = seq
+        self.pending = len(records)
+        return snapshot, records
+
+    def append(self, record):
+        """Durably record one change"""
+        if self.file is None:
+            self.file = open(self.journal_path, 'a')
+        self.seq += 1
+        self.file.write(json.dumps(dict(record, seq=self.seq)) + "\n")
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+        self.pending += 1
+
+    def should_compact(self):
+        return self.pending >= self.compact_every
+
+    def compact(self, snapshot):
+        """Replace the snapshot and start an empty journal"""
+        atomic_write_json(self.snapshot_path, {"seq": self.seq, "data": snapshot})
+        if self.file is not None:
+            self.file.close()
+        self.file = open(self.journal_path, 'w')
+        self.pending = 0
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,90 @@
+import re
+import json
+import logging
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+VOCABULARY_FILE = 'vocabulary.json'
+
+
+def _phrase(text):
+    """Canonical form of a keyword or matched text: lowercase, single spaces"""
+    return " ".join(text.lower().split())
+
+
+class KeywordMatcher:
+    """
+    Finds whole-word keywords and phrases in text with one compiled regex,
+    and maps them to the values they were given.
+
+    The keywords are merged into a character trie and emitted as nested
+    alternations, so a scan walks shared prefixes once instead of trying
+    every keyword, and the cost hardly grows with the vocabulary. Longer
+    keywords are tried first at each position ("beams" before "beam") and
+    matches must start and end on word boundaries ("light" does not match
+    "sunlight"). Spaces in a phrase match any run of whitespace.
+    """
+
+    def __init__(self, mapping):
+        self.values = {_phrase(keyword): value for keyword, value in mapping.items()}
+        self.values.pop('', None)
+
+        trie = {}
+        for keyword in self.values:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = True
+
+        pattern = self._pattern(trie) if trie else r'(?!)'
+        self.regex = re.compile(rf'(?<!\w)(?:{pattern})(?!\w)', re.IGNORECASE)
+
+    @classmethod
+    def _pattern(cls, node):
+        branches = [
+            (r'\s+' if char == ' ' else re.escape(char)) + cls._pattern(child)
+            for char, child in sorted(node.items())
+            if char != ''
+        ]
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        group = f"(?:{'|'.join(branches)})"
+        # Greedy '?' tries the longer continuation before stopping here
+        return group + '?' if '' in node else group
+
+    def finditer(self, text):
+        """Yield (start, end, keyword) for each non-overlapping match"""
+        for match in self.regex.finditer(text):
+            yield match.start(), match.end(), _phrase(match.group())
+
+    def find_all(self, text):
+        """Distinct matched keywords in order of first appearance"""
+        found = {}
+        for _, _, keyword in self.finditer(text):
+            found.setdefault(keyword)
+        return list(found)
+
+    def replace(self, text):
+        """Replace every match with its value in a single pass"""
+        return self.regex.sub(lambda match: self.values[_phrase(match.group())], text)
+
+
+_vocabulary = None
+_vocabulary_lock = Lock()
+
+
+def load_vocabulary(path=VOCABULARY_FILE):
+    """Load the shared vocabulary file once; missing or invalid files give empty sections"""
+    global _vocabulary
+    with _vocabulary_lock:
+        if _vocabulary is None:
+            try:
+                with open(path, 'r') as f:
+                    _vocabulary = json.load(f)
+            except Exception as e:
+                logger.error(f"Error loading vocabulary from {path}: {str(e)}")
+                _vocabulary = {}
+        return _vocabulary
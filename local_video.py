@@ -0,0 +1,185 @@
+import os
+import math
+import time
+import shutil
+import logging
+import tempfile
+import subprocess
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class LocalVideoEngine:
+    """
+    Turns a still image into a short seamless loop on the CPU, used when
+    Runway fails or times out and as a placeholder while a Runway job runs.
+
+    In keeping with the static-camera motion prompts, the frame never
+    moves: light shimmers over the bright areas, a low-frequency noise field
+    gently warps the image, and soft particles drift through it. Every
+    effect is a periodic function of the loop phase, so the last frame
+    runs straight into the first. Frames are rendered with NumPy/OpenCV and
+    piped as raw video to ffmpeg for H.264 encoding.
+    """
+
+    def __init__(self, config=None):
+        settings = (config or {}).get('local_video', {})
+        self.enabled = settings.get('enabled', True)
+        self.placeholder = settings.get('placeholder', False)
+        self.width = settings.get('width', 1280)
+        self.height = settings.get('height', 768)
+        self.fps = settings.get('fps', 24)
+        self.duration = settings.get('duration', 5)
+        self.ffmpeg = settings.get('ffmpeg', 'ffmpeg')
+        self.preset = settings.get('preset', 'veryfast')
+        self.crf = settings.get('crf', 20)
+        self.warp_pixels = settings.get('warp_pixels', 3.0)
+        self.shimmer = settings.get('shimmer', 0.08)
+        self.particles = settings.get('particles', 90)
+
+        if self.enabled and shutil.which(self.ffmpeg) is None:
+            logger.warning(f"{self.ffmpeg} not found, local video generation disabled")
+            self.enabled = False
+
+        # Renders take seconds of CPU, so they get their own workers rather
+        # than holding a pipeline worker or the Runway poller
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.get('workers', 1),
+            thread_name_prefix='local-render'
+        )
+
+    def submit(self, image_path, output_path, seed=None):
+        """Render on the engine's workers; returns a Future for render()'s result"""
+        return self.executor.submit(self.render, image_path, output_path, seed)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def render(self, image_path, output_path, seed=None):
+        """Render a loop for image_path to output_path; returns the path or None"""
+        if not self.enabled or not image_path:
+            return None
+
+        started = time.time()
+        directory = os.path.dirname(os.path.abspath(output_path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".part_", suffix=".mp4")
+        os.close(fd)
+        try:
+            frame = self._load(image_path)
+            if frame is None:
+                return None
+
+            process = subprocess.Popen(
+                [
+                    self.ffmpeg, '-y', '-loglevel', 'error',
+                    '-f', 'rawvideo', '-pix_fmt', 'bgr24',
+                    '-s', f'{self.width}x{self.height}', '-r', str(self.fps),
+                    '-i', '-',
+                    '-c:v', 'libx264', '-preset', self.preset, '-crf', str(self.crf),
+                    '-pix_fmt', 'yuv420p', '-movflags', '+faststart',
+                    temp_path
+                ],
+                stdin=subprocess.PIPE,
+                stderr=subprocess.PIPE
+            )
+            try:
+                for rendered in self._frames(frame, np.random.default_rng(seed)):
+                    process.stdin.write(rendered.data)
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+            error = process.stderr.read().decode(errors='replace').strip()
+            if process.wait() != 0:
+                logger.error(f"ffmpeg failed to encode local video: {error}")
+                return None
+
+            os.replace(temp_path, output_path)
+            logger.info(f"Rendered local video in {time.time() - started:.1f}s: {output_path}")
+            return output_path
+        except Exception as e:
+            logger.error(f"Error rendering local video: {str(e)}")
+            return None
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _load(self, image_path):
+        """Read the image and cover-crop it to the output size"""
+        import cv2
+
+        image = cv2.imread(image_path, cv2.IMREAD_COLOR)
+        if image is None:
+            logger.error(f"Could not read image for local video: {image_path}")
+            return None
+        height, width = image.shape[:2]
+        scale = max(self.width / width, self.height / height)
+        resized = cv2.resize(
+            image,
+            (max(self.width, round(width * scale)), max(self.height, round(height * scale))),
+            interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+        )
+        top = (resized.shape[0] - self.height) // 2
+        left = (resized.shape[1] - self.width) // 2
+        return resized[top:top + self.height, left:left + self.width]
+
+    def _noise(self, rng, cells):
+        """Smooth random field in [-1, 1] at output resolution"""
+        import cv2
+
+        coarse = rng.uniform(-1, 1, (cells, round(cells * self.width / self.height))).astype(np.float32)
+        return cv2.resize(coarse, (self.width, self.height), interpolation=cv2.INTER_CUBIC)
+
+    def _frames(self, image, rng):
+        import cv2
+
+        frames = max(1, round(self.duration * self.fps))
+        base = image.astype(np.float32)
+
+        # Warp: two noise fields per axis blended around a circle of phase
+        grid_x, grid_y = np.meshgrid(
+            np.arange(self.width, dtype=np.float32),
+            np.arange(self.height, dtype=np.float32)
+        )
+        warp = [self._noise(rng, 4) * self.warp_pixels for _ in range(4)]
+
+        # Shimmer: brightness ripple over the highlights with a travelling phase
+        luma = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY).astype(np.float32) / 255.0
+        highlights = cv2.GaussianBlur(np.clip((luma - 0.45) / 0.55, 0, 1), (0, 0), 9)
+        shimmer_phase = (self._noise(rng, 6) + 1) * np.pi
+        shimmer_gain = (highlights * self.shimmer)[..., None]
+
+        # Particles: small closed orbits plus a twinkle, all periodic
+        count = self.particles
+        origin = rng.uniform((0, 0), (self.width, self.height), (count, 2))
+        radius = rng.uniform(4, 24, (count, 2))
+        phase = rng.uniform(0, 2 * np.pi, (count, 2))
+        cycles = rng.integers(1, 3, count)
+        brightness = rng.uniform(40, 140, count)
+
+        layer = np.zeros((self.height, self.width), np.float32)
+        output = np.empty((self.height, self.width, 3), np.uint8)
+
+        for index in range(frames):
+            angle = 2 * np.pi * index / frames
+            cos_a, sin_a = math.cos(angle), math.sin(angle)
+
+            map_x = grid_x + warp[0] * cos_a + warp[1] * sin_a
+            map_y = grid_y + warp[2] * cos_a + warp[3] * sin_a
+            frame = cv2.remap(base, map_x, map_y, cv2.INTER_LINEAR, borderMode=cv2.BORDER_REFLECT)
+
+            frame *= 1 + shimmer_gain * np.sin(shimmer_phase + angle)[..., None]
+
+            turn = angle * cycles[:, None] + phase
+            position = origin + radius * np.stack((np.cos(turn[:, 0]), np.sin(turn[:, 1])), axis=1)
+            xs = np.clip(position[:, 0].astype(np.int32), 0, self.width - 1)
+            ys = np.clip(position[:, 1].astype(np.int32), 0, self.height - 1)
+            layer.fill(0)
+            np.add.at(layer, (ys, xs), brightness * (0.6 + 0.4 * np.sin(turn[:, 0])))
+            glow = cv2.GaussianBlur(layer, (0, 0), 2.5) * 12
+            frame += glow[..., None]
+
+            np.clip(frame, 0, 255, out=frame)
+            output[:] = frame
+            yield output
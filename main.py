@@ -1,16 +1,21 @@
 #!/usr/bin/env python3
 import json
 import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import logging
 import warnings
+import metrics
 from queue_manager import QueueManager
-from audio_listener import AudioListener
-from transcriber import Transcriber
-from prompt_parser import PromptParser
-from image_gen import ImageGenerator
-from video_gen import VideoGenerator
-from video_player import VideoPlayer
+from artifact_store import ArtifactIndex, artifact_id, artifact_path
+from result_cache import ResultCache
+from prompt_gate import PromptGate
+from transcoder import Transcoder
+from storage import StorageManager
+from pipeline import Job, Pipeline, defer
 
 # Suppress all warnings
 warnings.filterwarnings('ignore')
@@ -22,74 +27,408 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class StartupTimer:
+    """Wall-clock time per startup phase; phases may overlap across threads"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.phases = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.time()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.phases[name] = time.time() - start
+
+    def report(self, log_file=None):
+        """Print the breakdown and optionally append it to a JSONL log"""
+        total = time.time() - self.started
+        breakdown = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases.items())
+        print(f"Startup took {total:.2f}s ({breakdown})")
+        if log_file:
+            try:
+                with open(log_file, 'a') as f:
+                    f.write(json.dumps({
+                        "timestamp": self.started,
+                        "total": round(total, 3),
+                        "phases": {name: round(seconds, 3) for name, seconds in self.phases.items()}
+                    }) + "\n")
+            except Exception as e:
+                logger.warning(f"Could not write startup timings: {str(e)}")
+
 class FieldOfVision:
     def __init__(self):
         print("\nInitializing Field of Vision...")
+        self.startup = StartupTimer()
+        self.pipeline_ready = threading.Event()
         
         # Load environment variables and configuration
-        load_dotenv()
-        with open('config.json', 'r') as f:
-            self.config = json.load(f)
-
-        # Initialize components
-        self.queue_manager = QueueManager(self.config)
-        self.audio_listener = AudioListener(self.config)
-        self.transcriber = Transcriber()
-        self.prompt_parser = PromptParser()
-        self.image_generator = ImageGenerator()
-        self.video_generator = VideoGenerator()
-        self.video_player = VideoPlayer(self.config)
+        with self.startup.phase('config'):
+            load_dotenv()
+            with open('config.json', 'r') as f:
+                self.config = json.load(f)
+            self.metrics = metrics.configure(self.config.get('metrics', {}))
+
+        with self.startup.phase('queue'):
+            self.queue_manager = QueueManager(self.config)
+            self.artifacts = ArtifactIndex(self.config)
+            self.storage = StorageManager(self.config, self.artifacts, self.queue_manager)
+            self.result_cache = ResultCache(self.config)
+            self.prompt_gate = PromptGate(self.config)
+            self.transcoder = Transcoder(self.config)
+
+        # Build components concurrently. Heavy modules are imported inside
+        # the factories; the player comes up first and shows fallback
+        # content while the transcriber model loads.
+        with ThreadPoolExecutor(max_workers=4, thread_name_prefix='init') as executor:
+            player = executor.submit(self._timed, 'player', self._create_player)
+            transcriber = executor.submit(self._timed, 'transcriber', self._create_transcriber)
+            audio = executor.submit(self._timed, 'audio', self._create_audio_listener)
+            generators = executor.submit(self._timed, 'generators', self._create_generators)
+
+            self.video_player = player.result()
+            self.video_player.start()
+
+            self.audio_listener = audio.result()
+            (self.prompt_parser, self.image_generator,
+             self.video_generator, self.local_video) = generators.result()
+            self.transcriber = transcriber.result()
+
+        from speculation import SpeculativeImages
+        self.speculation = SpeculativeImages(
+            self.config, self._speculative_prompt, self.image_generator.generate
+        )
+
+        self.pipeline = self._build_pipeline()
+        self.pipeline_ready.set()
+        self.startup.report(self.config.get('startup_log_file'))
+
+    def _timed(self, phase, factory):
+        with self.startup.phase(phase):
+            return factory()
+
+    def _create_player(self):
+        from video_player import VideoPlayer
+        return VideoPlayer(self.config, self.queue_manager)
+
+    def _create_transcriber(self):
+        from transcriber import Transcriber
+        return Transcriber(self.config)
+
+    def _create_audio_listener(self):
+        from audio_listener import AudioListener
+        return AudioListener(self.config)
+
+    def _create_generators(self):
+        import http_client
+        from prompt_parser import PromptParser
+        from image_gen import ImageGenerator
+        from video_gen import VideoGenerator
+        from local_video import LocalVideoEngine
+        http_client.configure(self.config.get('http', {}))
+        return (
+            PromptParser(self.config),
+            ImageGenerator(),
+            VideoGenerator(self.config, on_recovered=self._on_recovered_video),
+            LocalVideoEngine(self.config)
+        )
 
     def start(self):
         """Main execution loop"""
         print("\nField of Vision ready - Speak your scene description (Press Ctrl+C to exit)")
         
         try:
-            # Start video player in a separate thread
-            self.video_player.start()
+            # Video player is already running from __init__
+            self.pipeline.start()
 
+            # Capture stays on this thread; everything after it runs in the
+            # pipeline so the microphone is free while earlier jobs generate
             while True:
                 print("\nListening for audio...")
-                audio_data = self.audio_listener.record()
+                job = self._capture()
                 
-                if not audio_data:
+                if job is None:
                     print("No audio detected, trying again...")
                     continue
 
-                print("Transcribing audio...")
-                text = self.transcriber.transcribe(audio_data)
+                self.pipeline.submit(job)
+
+        except KeyboardInterrupt:
+            print("\nShutting down...")
+            self.cleanup()
+
+    def _build_pipeline(self):
+        """Create the transcribe -> parse -> image -> video -> normalize -> enqueue stages"""
+        return Pipeline.from_config(self.config, [
+            ('transcribe', self._transcribe),
+            ('parse', self._parse),
+            ('image', self._generate_image),
+            ('video', self._generate_video),
+            ('normalize', self._normalize),
+            ('enqueue', self._enqueue),
+        ])
+
+    def _capture(self):
+        """Record one utterance; in streaming mode it is transcribed while it is spoken"""
+        if self._streaming_transcription():
+            with self.metrics.span('record_transcribe') as span:
+                text = self.transcriber.transcribe_stream(
+                    self.audio_listener.stream_utterance(),
+                    on_partial=self._show_partial
+                )
+                speculation = self.speculation.claim(text or "")
                 if not text:
-                    print("Could not transcribe audio, please try again...")
-                    continue
+                    span['status'] = 'empty'
+                    return None
+                job = Job()
+                job.text = text
+                job.speculation = speculation
+                span['job_id'] = job.job_id
+                span['speculative'] = speculation is not None
+                return job
 
-                print(f"\nTranscribed: {text}")
+        with self.metrics.span('record') as span:
+            audio_data = self.audio_listener.record()
+            if audio_data is None:
+                span['status'] = 'empty'
+                return None
+            job = Job(audio_data)
+            span['job_id'] = job.job_id
+            return job
 
-                prompt = self.prompt_parser.parse(text)
-                if not prompt:
-                    print("Could not generate prompt, please try again...")
-                    continue
+    def _streaming_transcription(self):
+        return (
+            self.config.get('transcribe_mode') == 'streaming'
+            and self.audio_listener.capture_mode == 'vad'
+        )
 
-                image_path = self.image_generator.generate(prompt)
-                if not image_path:
-                    print("Could not generate image, please try again...")
-                    continue
+    def _show_partial(self, text, stable_text):
+        print(f"... {text}")
+        self.speculation.on_partial(text, stable_text)
 
-                print("\nGenerating video animation...")
-                video_path = self.video_generator.generate(image_path, prompt)
-                if not video_path:
-                    print("Could not generate video, please try again...")
-                    continue
+    def _transcribe(self, job):
+        if job.text:
+            print(f"\nTranscribed: {job.text}")
+            return job
 
-                print("\nVideo generated successfully!")
-                self.queue_manager.add_video(video_path)
+        print("Transcribing audio...")
+        job.text = self.transcriber.transcribe(job.audio)
+        job.audio = None
+        if not job.text:
+            print("Could not transcribe audio, please try again...")
+            return None
 
-        except KeyboardInterrupt:
-            print("\nShutting down...")
-            self.cleanup()
+        print(f"\nTranscribed: {job.text}")
+        return job
+
+    def _parse(self, job):
+        scene = self.prompt_parser.extract(job.text)
+        if not scene:
+            print("Could not generate prompt, please try again...")
+            return None
+
+        # A scene that was generated before is queued straight away
+        cached = self.result_cache.lookup(job.text)
+        if cached:
+            print("\nFound this scene in the cache, queueing it now")
+            self.metrics.event('cache_hit', job.job_id)
+            job.prompt = self.prompt_parser.build_prompt(scene)
+            job.image_path = cached.get("image_path")
+            job.video_path = cached["video_path"]
+            if job.speculation:
+                self.speculation.discard(job.speculation)
+            self.artifacts.record(job.job_id, text=job.text, prompt=job.prompt, created_at=job.created_at,
+                                  video_path=job.video_path, cache_hit=True)
+            job.skip_to = 'enqueue'
+            return job
+
+        # Screen the scene before paying for an image and a video
+        scene, reason = self.prompt_gate.check(scene)
+        if scene is None:
+            print(f"That scene can't be generated ({reason}), please try another...")
+            self.metrics.event('prompt_rejected', job.job_id, reason=reason)
+            if job.speculation:
+                self.speculation.discard(job.speculation)
+            self.artifacts.record(job.job_id, text=job.text, rejected=reason, created_at=job.created_at)
+            return None
+
+        job.prompt = self.prompt_parser.build_prompt(scene)
+        print(f"Enhanced prompt: {job.prompt}")
+        self.artifacts.record(job.job_id, text=job.text, prompt=job.prompt, created_at=job.created_at)
+        return job
+
+    def _speculative_prompt(self, text):
+        """Prompt for a partial transcript, gated without counting as a request"""
+        scene, _ = self.prompt_gate.check(self.prompt_parser.extract(text), record=False)
+        return self.prompt_parser.build_prompt(scene) if scene else None
+
+    def _generate_image(self, job):
+        if job.speculation:
+            # Started from the partial transcript; regenerate if it failed
+            job.image_path = job.speculation.future.result()
+            if job.image_path:
+                self.artifacts.record(job.job_id, speculative_id=job.speculation.artifact_id)
+            job.speculation = None
+        if not job.image_path:
+            job.image_path = self.image_generator.generate(job.prompt, artifact_id=job.job_id)
+        if not job.image_path:
+            print("Could not generate image, please try again...")
+            return None
+        self.artifacts.add_file(job.job_id, 'image', job.image_path)
+        return job
+
+    def _generate_video(self, job):
+        print("\nGenerating video animation...")
+        future = self.video_generator.submit(job.image_path, job.prompt, meta={"job_id": job.job_id})
+
+        # Show a locally rendered loop while the Runway job runs
+        preview = None
+        if self.local_video.placeholder:
+            preview = self._render_local(job)
+            if preview is not None:
+                preview = defer(preview, lambda path: self._show_preview(job, path))
+
+        return defer(future, lambda video_path: self._video_ready(job, video_path, preview))
+
+    def _show_preview(self, job, path):
+        if path:
+            job.placeholder_path = path
+            print("Showing a local preview until the video is ready")
+            self._queue_clip(job, path)
+        return path
+
+    def _video_ready(self, job, video_path, preview=None):
+        if preview is not None and not preview.done():
+            # Let the preview reach the queue first, so it can be retired
+            return defer(preview, lambda _: self._video_ready(job, video_path))
+        if video_path:
+            job.video_path = video_path
+            return job
+        if job.placeholder_path:
+            print("\nRunway video unavailable, keeping the local preview")
+            return None
+        print("\nRunway video unavailable, using a locally rendered loop")
+        return self._local_fallback(job)
+
+    def _normalize(self, job):
+        """Transcode a downloaded clip to the playback profile before it is queued"""
+        # Local loops are rendered in the playback profile already
+        if job.duration is None:
+            clip = self.transcoder.normalize(
+                job.video_path,
+                artifact_path(self.video_generator.save_dir, job.job_id, 'loop.mp4')
+            )
+            if clip:
+                job.video_path = clip["path"]
+                job.duration = clip["duration"]
+                job.thumbnail_path = clip["thumbnail_path"]
+                # Local loops are not cached, so a repeat request tries Runway again
+                if job.text:
+                    self.result_cache.store(job.text, job.video_path, job.image_path)
+            elif job.placeholder_path:
+                print("\nCould not prepare the video, keeping the local preview")
+                return None
+            else:
+                fallback = self._local_fallback(job)
+                return defer(fallback, self._clip_ready) if fallback else None
+        return self._clip_ready(job)
+
+    def _clip_ready(self, job):
+        if job is None:
+            return None
+        if job.placeholder_path:
+            self._retire_placeholder(job.placeholder_path)
+        self.artifacts.add_file(job.job_id, 'video', job.video_path)
+        if job.thumbnail_path:
+            self.artifacts.add_file(job.job_id, 'thumbnail', job.thumbnail_path)
+        print("\nVideo generated successfully!")
+        return job
+
+    def _local_fallback(self, job):
+        """Future for the job with a locally rendered clip, or None when there is none"""
+        render = self._render_local(job)
+        if render is None:
+            print("Could not generate video, please try again...")
+            return None
+        return defer(render, lambda path: self._local_ready(job, path))
+
+    def _local_ready(self, job, path):
+        if not path:
+            print("Could not generate video, please try again...")
+            return None
+        job.video_path = path
+        job.duration = self.local_video.duration
+        return job
+
+    def _render_local(self, job):
+        """Future for a local loop rendered on the engine's workers, or None if disabled"""
+        if not self.local_video.enabled:
+            return None
+        path = artifact_path(self.video_generator.save_dir, job.job_id, 'local.mp4')
+        started = time.time()
+        render = self.local_video.submit(job.image_path, path)
+        return defer(render, lambda path: self._local_rendered(job, path, started))
+
+    def _local_rendered(self, job, path, started):
+        self.metrics.record_span('local_render', time.time() - started, started, {
+            "job_id": job.job_id,
+            "status": "ok" if path else "failed"
+        })
+        if path:
+            self.artifacts.add_file(job.job_id, 'local_video', path)
+        return path
+
+    def _retire_placeholder(self, path):
+        """Drop a local preview from the queue and replays once the real clip exists"""
+        self.queue_manager.remove_video(path)
+        self.queue_manager.catalog.remove(path)
+
+    def _on_recovered_video(self, video_path, meta):
+        """Queue a video whose Runway task outlived its job, e.g. across a restart"""
+        job = Job()
+        job.job_id = meta.get("job_id") or artifact_id(video_path) or job.job_id
+        job.prompt = meta.get("prompt")
+        job.image_path = meta.get("image_path")
+        job.video_path = video_path
+        job.placeholder_path = (self.artifacts.get(job.job_id) or {}).get("local_video_path")
+        # Tasks resumed at startup can finish before the pipeline exists
+        self.pipeline_ready.wait()
+        self.pipeline.submit(job, stage='normalize')
+
+    def _enqueue(self, job):
+        self._queue_clip(job, job.video_path)
+        return None
+
+    def _queue_clip(self, job, video_path):
+        with self.metrics.span('add_video', job.job_id):
+            self.queue_manager.add_video(video_path, metadata={
+                "prompt": job.prompt,
+                "image_path": job.image_path,
+                "duration": job.duration or self.video_generator.duration,
+                "thumbnail_path": job.thumbnail_path,
+                "created_at": time.time()
+            })
 
     def cleanup(self):
         """Cleanup resources"""
+        self.pipeline.stop()
         self.video_player.stop()
+        if self.speculation.enabled:
+            print(f"Speculative images: {self.speculation.stats()}")
+        print(f"Prompt gate: {self.prompt_gate.stats()}")
+        print(f"Storage: {self.storage.stats()}")
+        self.storage.close()
+        self.speculation.close()
+        self.local_video.close()
+        self.video_generator.close()
+        import http_client
+        http_client.close()
+        # Last, so spans recorded while shutting down are still written
+        self.metrics.close()
 
 if __name__ == "__main__":
     os.environ['PYTHONWARNINGS'] = 'ignore'
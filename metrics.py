@@ -0,0 +1,218 @@
+import json
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import SimpleQueue
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans range from milliseconds (parse) to minutes (Runway)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 90, 120, 180, 300)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    Counters, histograms and a job trace for the whole pipeline.
+
+    span() times a block, adds it to the fov_span_seconds histogram and
+    fov_spans_total counter (by span name and status), and queues a trace
+    record tagged with the job ID. Recording is a few dict updates under a
+    lock; trace records are written to the JSONL file by a background
+    thread, and the Prometheus text format is only built when scraped.
+    """
+
+    def __init__(self, trace_file=None, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.server = None
+
+        self.trace_file = trace_file
+        self.trace_queue = SimpleQueue()
+        self.trace_thread = None
+        if trace_file:
+            self.trace_thread = threading.Thread(target=self._write_traces, name="metrics-trace", daemon=True)
+            self.trace_thread.start()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, name, job_id=None, **attrs):
+        """
+        Time a block. The yielded dict can be updated inside it, e.g. to
+        set job_id once it is known or status='failed'; an exception
+        records status='error'.
+        """
+        record = dict(attrs, job_id=job_id, status='ok')
+        started = time.time()
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            record['status'] = 'error'
+            raise
+        finally:
+            self.record_span(name, time.perf_counter() - start, started, record)
+
+    def record_span(self, name, seconds, started, record):
+        """Record a span timed elsewhere, e.g. from a journal timestamp"""
+        status = record.get('status', 'ok')
+        self.observe('fov_span_seconds', seconds, span=name)
+        self.inc('fov_spans_total', span=name, status=status)
+        self.trace(name, dict(record, start=started, seconds=round(seconds, 6)))
+
+    def event(self, name, job_id=None, **attrs):
+        """Count a point-in-time event and add it to the trace"""
+        self.inc('fov_events_total', event=name)
+        self.trace(name, dict(attrs, job_id=job_id, start=time.time()))
+
+    def trace(self, name, record):
+        if self.trace_thread is not None:
+            self.trace_queue.put(dict(record, name=name))
+
+    def render(self):
+        """Everything recorded so far in the Prometheus text exposition format"""
+        with self.lock:
+            counters = list(self.counters.items())
+            histograms = [
+                (key, list(h.counts), h.sum, h.count, h.buckets)
+                for key, h in self.histograms.items()
+            ]
+
+        lines = []
+        typed = set()
+        for (name, labels), value in sorted(counters):
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+        for (name, labels), counts, total, count, buckets in sorted(histograms, key=lambda h: h[0]):
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {total}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, host='127.0.0.1', port=9108):
+        """Expose render() at http://host:port/metrics on a daemon thread"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self.server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            logger.warning(f"Could not start metrics endpoint on {host}:{port}: {str(e)}")
+            return
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+        logger.info(f"Metrics available at http://{host}:{port}/metrics")
+
+    def close(self):
+        """Stop the endpoint and write out any queued trace records"""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.trace_thread is not None:
+            self.trace_queue.put(None)
+            self.trace_thread.join(timeout=5)
+            self.trace_thread = None
+
+    def _write_traces(self):
+        with open(self.trace_file, 'a') as f:
+            while True:
+                record = self.trace_queue.get()
+                if record is None:
+                    break
+                try:
+                    f.write(json.dumps(record) + "\n")
+                    # Flush once the backlog is drained
+                    if self.trace_queue.empty():
+                        f.flush()
+                except Exception as e:
+                    logger.warning(f"Could not write trace record: {str(e)}")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def configure(settings):
+    """Replace the shared registry using the 'metrics' config section"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is not None:
+            _metrics.close()
+        _metrics = Metrics(trace_file=settings.get('trace_file'))
+        if settings.get('port'):
+            _metrics.serve(settings.get('host', '127.0.0.1'), settings['port'])
+        return _metrics
+
+
+def get_metrics():
+    """Return the shared registry, creating one without exporters on first use"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+        return _metrics
@@ -0,0 +1,179 @@
+import json
+import time
+import zlib
+import random
+import struct
+import itertools
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _png(width=256, height=256):
+    """A small gradient PNG built without image libraries"""
+    rows = bytearray()
+    for y in range(height):
+        rows.append(0)
+        for x in range(width):
+            rows += bytes((x * 255 // width, y * 255 // height, 160))
+
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body) & 0xffffffff)
+
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        + chunk(b'IDAT', zlib.compress(bytes(rows)))
+        + chunk(b'IEND', b'')
+    )
+
+
+class MockAPIServer:
+    """
+    Local stand-in for the DALL-E and Runway APIs, for benchmarks and
+    offline runs. One server answers both; point OPENAI_API_BASE and
+    RUNWAY_API_BASE at api_base:
+
+        POST /v1/images/generations   -> {"data": [{"url": ...}]}
+        POST /v1/image_to_video       -> {"id": ...}
+        GET  /v1/tasks/<id>           -> RUNNING with progress, then SUCCEEDED or FAILED
+        GET  /files/<name>            -> image or video bytes
+
+    Latencies are means in seconds with +/-jitter (a fraction). A request
+    fails with 500 (or a task with FAILED) at failure_rate, and is
+    throttled with 429 and Retry-After at rate_limit_rate.
+    """
+
+    def __init__(self, image_latency=1.0, video_latency=5.0, jitter=0.2, failure_rate=0.0,
+                 rate_limit_rate=0.0, retry_after=1, video_bytes=1 << 20, seed=None):
+        self.image_latency = image_latency
+        self.video_latency = video_latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.tasks = {}
+        self.task_ids = itertools.count(1)
+        self.files = {'image.png': _png(), 'video.mp4': b'\x00' * video_bytes}
+        self.server = None
+
+    @property
+    def api_base(self):
+        return f"http://127.0.0.1:{self.server.server_port}/v1"
+
+    def start(self, port=0):
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="mock-apis", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts)
+
+    def _latency(self, mean):
+        with self.lock:
+            return max(0.0, mean * (1 + self.random.uniform(-self.jitter, self.jitter)))
+
+    def _roll(self, rate):
+        with self.lock:
+            return self.random.random() < rate
+
+    def _count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body=None, raw=None, headers=None):
+                data = raw if raw is not None else json.dumps(body or {}).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, str(value))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _throttled(self, name):
+                if mock._roll(mock.rate_limit_rate):
+                    mock._count(f"{name}_429")
+                    self._send(429, {"error": "rate limited"}, headers={"Retry-After": mock.retry_after})
+                    return True
+                return False
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                base = f"http://127.0.0.1:{self.server.server_port}/files"
+
+                if self.path == '/v1/images/generations':
+                    if self._throttled('image'):
+                        return
+                    time.sleep(mock._latency(mock.image_latency))
+                    if mock._roll(mock.failure_rate):
+                        mock._count('image_failed')
+                        self._send(500, {"error": "mock failure"})
+                        return
+                    mock._count('image')
+                    self._send(200, {"data": [{"url": f"{base}/image.png"}]})
+
+                elif self.path == '/v1/image_to_video':
+                    if self._throttled('video'):
+                        return
+                    task_id = f"task-{next(mock.task_ids)}"
+                    with mock.lock:
+                        mock.tasks[task_id] = (
+                            time.time(),
+                            mock.video_latency * (1 + mock.random.uniform(-mock.jitter, mock.jitter)),
+                            mock.random.random() < mock.failure_rate
+                        )
+                    mock._count('video')
+                    self._send(200, {"id": task_id})
+
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def do_GET(self):
+                if self.path.startswith('/v1/tasks/'):
+                    mock._count('poll')
+                    with mock.lock:
+                        task = mock.tasks.get(self.path.rsplit('/', 1)[-1])
+                    if task is None:
+                        self._send(404, {"error": "unknown task"})
+                        return
+                    submitted, latency, fails = task
+                    progress = (time.time() - submitted) / latency if latency else 1.0
+                    base = f"http://127.0.0.1:{self.server.server_port}/files"
+                    if progress < 1:
+                        self._send(200, {"status": "RUNNING", "progress": round(progress, 3)})
+                    elif fails:
+                        mock._count('video_failed')
+                        self._send(200, {"status": "FAILED"})
+                    else:
+                        self._send(200, {"status": "SUCCEEDED", "output": [f"{base}/video.mp4"]})
+
+                elif self.path.startswith('/files/'):
+                    data = mock.files.get(self.path.rsplit('/', 1)[-1])
+                    if data is None:
+                        self._send(404, {"error": "not found"})
+                    else:
+                        self._send(200, raw=data)
+                else:
+                    self._send(404, {"error": "not found"})
+
+        return Handler
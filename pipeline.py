@@ -0,0 +1,201 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from queue import Queue
+from artifact_store import new_id
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class Job:
+    """State carried by one visitor utterance through the pipeline"""
+
+    def __init__(self, audio=None):
+        # Sortable ULID, also used to name the job's image and video files
+        self.job_id = new_id()
+        self.created_at = time.time()
+        self.audio = audio
+        self.text = None
+        self.prompt = None
+        self.image_path = None
+        # Set when a speculative image was started while the visitor spoke
+        self.speculation = None
+        self.video_path = None
+        # Set once the clip is in the playback profile
+        self.duration = None
+        self.thumbnail_path = None
+        # Local preview shown until the Runway clip is ready
+        self.placeholder_path = None
+        # Name of a later stage to jump to, skipping those in between
+        self.skip_to = None
+
+
+def defer(future, callback):
+    """
+    Return a Future for callback(future.result()). A stage function can
+    return one to finish asynchronously: its worker moves on at once and
+    the job counts against the stage's in-flight limit until it resolves.
+    The callback may itself return a Future to chain a further step.
+    """
+    chained = Future()
+
+    def done(source):
+        try:
+            result = callback(source.result())
+        except Exception as e:
+            logger.error(f"Error in deferred pipeline step: {str(e)}")
+            result = None
+        if isinstance(result, Future):
+            result.add_done_callback(forward)
+        else:
+            chained.set_result(result)
+
+    def forward(source):
+        try:
+            chained.set_result(source.result())
+        except Exception as e:
+            logger.error(f"Error in deferred pipeline step: {str(e)}")
+            chained.set_result(None)
+
+    future.add_done_callback(done)
+    return chained
+
+
+class Stage:
+    """
+    A pool of worker threads fed by a bounded queue. Each job's wait in the
+    queue and its time in the stage (until a deferred result resolves)
+    are recorded as metrics under the stage name.
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=0, max_in_flight=None):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue = Queue(maxsize=queue_size)
+        # Jobs queued or running in this stage; submit() blocks once the
+        # limit is reached, which pushes backpressure to the upstream stage
+        limit = max_in_flight or self.workers + queue_size or self.workers
+        self.in_flight = threading.BoundedSemaphore(limit)
+        self.downstream = None
+        self.threads = []
+
+    def start(self):
+        """Start the worker threads"""
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker,
+                name=f"{self.name}-{i}",
+                daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, job, timeout=None):
+        """Hand a job to this stage, blocking while the stage is full"""
+        if not self.in_flight.acquire(timeout=timeout):
+            return False
+        self.queue.put((job, time.time()))
+        return True
+
+    def stop(self):
+        """Ask every worker to exit once the queue is drained"""
+        for _ in self.threads:
+            self.queue.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+            job, queued_at = item
+            started = time.time()
+            get_metrics().observe('fov_stage_wait_seconds', started - queued_at, stage=self.name)
+            try:
+                result = self.func(job)
+            except Exception as e:
+                logger.error(f"Error in {self.name} stage: {str(e)}")
+                result = None
+
+            if isinstance(result, Future):
+                result.add_done_callback(
+                    lambda future, job=job, started=started: self._deferred_done(future, job, started)
+                )
+            else:
+                self._finish(job, result, started)
+
+    def _deferred_done(self, future, job, started):
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.error(f"Error in {self.name} stage: {str(e)}")
+            result = None
+        self._finish(job, result, started)
+
+    def _finish(self, job, result, started):
+        self.in_flight.release()
+        get_metrics().record_span(self.name, time.time() - started, started, {
+            "job_id": getattr(job, 'job_id', None),
+            # The last stage ends every job, so None only means dropped upstream of it
+            "status": "dropped" if result is None and self.downstream else "ok"
+        })
+        if result is not None and self.downstream:
+            self._next_stage(result).submit(result)
+
+    def _next_stage(self, job):
+        """The downstream stage, or the one the job asked to skip to"""
+        target = self.downstream
+        skip_to = getattr(job, 'skip_to', None)
+        if skip_to:
+            job.skip_to = None
+            while target.name != skip_to and target.downstream:
+                target = target.downstream
+        return target
+
+
+class Pipeline:
+    """Chain of stages; each stage returns the job to pass it on or None to drop it"""
+
+    def __init__(self, stages):
+        self.stages = stages
+        for upstream, downstream in zip(stages, stages[1:]):
+            upstream.downstream = downstream
+
+    @classmethod
+    def from_config(cls, config, handlers):
+        """Build stages from (name, func) pairs using the 'pipeline' config section"""
+        settings = config.get('pipeline', {})
+        stages = []
+        for name, func in handlers:
+            options = settings.get(name, {})
+            stages.append(Stage(
+                name,
+                func,
+                workers=options.get('workers', 1),
+                queue_size=options.get('queue_size', 0),
+                max_in_flight=options.get('max_in_flight')
+            ))
+        return cls(stages)
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def submit(self, job, timeout=None, stage=None):
+        """Feed a job into the first stage, or into the named one"""
+        target = self.stages[0]
+        if stage is not None:
+            target = next(s for s in self.stages if s.name == stage)
+        return target.submit(job, timeout=timeout)
+
+    def stop(self):
+        """Drain and stop stages from upstream to downstream"""
+        for stage in self.stages:
+            stage.stop()
@@ -0,0 +1,121 @@
+import time
+import logging
+from collections import Counter, OrderedDict, deque
+from threading import Lock
+from keyword_matcher import KeywordMatcher, load_vocabulary
+from metrics import get_metrics
+from result_cache import normalize
+
+logger = logging.getLogger(__name__)
+
+
+class PromptGate:
+    """
+    Local check between parsing and the paid image/video calls. A scene
+    is rejected when it contains a blocklisted term or has been requested
+    too often recently. A scene with no landscape content is rewritten
+    into one, or rejected if rewrite_off_topic is off.
+
+    check() takes a scene dict from PromptParser.extract() and returns
+    (scene, reason). The scene is None when rejected, and reason is None
+    when the scene passed unchanged. Outcomes are counted by reason, and
+    each rejection is credited with the image and video it didn't pay
+    for, both in stats() and in the metrics registry as
+    fov_prompt_gate_total{outcome} and fov_prompt_gate_dollars_saved_total.
+    """
+
+    def __init__(self, config):
+        settings = config.get('prompt_gate', {})
+        self.enabled = settings.get('enabled', True)
+        self.min_relevance = settings.get('min_relevance', 0.3)
+        self.rewrite_off_topic = settings.get('rewrite_off_topic', True)
+        self.rewrite_template = settings.get('rewrite_template', '{subject} in a serene natural landscape')
+        self.max_repeats = settings.get('max_repeats', 3)
+        self.repeat_window = settings.get('repeat_window_seconds', 600)
+        self.cost_per_job = settings.get('image_cost', 0.08) + settings.get('video_cost', 0.25)
+
+        terms = {}
+        for category, words in load_vocabulary().get('blocklist', {}).items():
+            for word in words:
+                terms[word] = category
+        self.blocklist = KeywordMatcher(terms)
+
+        self.lock = Lock()
+        self.recent = OrderedDict()
+        self.counts = Counter()
+        self.dollars_saved = 0.0
+
+    def check(self, scene, record=True):
+        """
+        Gate a scene. With record=False the check doesn't count towards the
+        repeat limit or the stats, e.g. for speculative generation.
+        """
+        if not self.enabled or scene is None:
+            return scene, None
+
+        blocked = self.blocklist.find_all(scene["subject"])
+        if blocked:
+            return self._reject(f"blocked:{self.blocklist.values[blocked[0]]}", record)
+
+        if not self._allow_repeat(normalize(scene["subject"]), record):
+            return self._reject("repeated", record)
+
+        reason = None
+        if self.relevance(scene) < self.min_relevance:
+            if not self.rewrite_off_topic:
+                return self._reject("off_topic", record)
+            scene = dict(scene, subject=self.rewrite_template.format(subject=scene["subject"]))
+            reason = "rewritten:off_topic"
+
+        if record:
+            self._count(reason or "passed")
+        return scene, reason
+
+    def relevance(self, scene):
+        """0-1 score of how much of the scene is landscape language"""
+        score = (
+            len(scene["nouns"])
+            + 0.5 * (len(scene["time_of_day"]) + len(scene["weather"]))
+            + 0.25 * len(scene["modifiers"])
+        )
+        return min(1.0, score)
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts, dollars_saved=round(self.dollars_saved, 2))
+
+    def _allow_repeat(self, key, record):
+        now = time.time()
+        with self.lock:
+            # Forget prompts whose newest request has left the window
+            while self.recent:
+                oldest, times = next(iter(self.recent.items()))
+                if now - times[-1] <= self.repeat_window:
+                    break
+                del self.recent[oldest]
+
+            times = self.recent.get(key, deque())
+            while times and now - times[0] > self.repeat_window:
+                times.popleft()
+            if len(times) >= self.max_repeats:
+                return False
+            if record:
+                times.append(now)
+                self.recent[key] = times
+                self.recent.move_to_end(key)
+            return True
+
+    def _reject(self, reason, record):
+        if record:
+            logger.info(f"Prompt rejected: {reason}")
+            self._count(reason, saved=self.cost_per_job)
+        return None, reason
+
+    def _count(self, outcome, saved=0.0):
+        with self.lock:
+            self.counts[outcome] += 1
+            self.dollars_saved += saved
+        metrics = get_metrics()
+        metrics.inc('fov_prompt_gate_total', outcome=outcome)
+        if saved:
+            metrics.inc('fov_prompt_gate_dollars_saved_total', saved)
@@ -1,29 +1,210 @@
+import re
+import time
 import logging
+from keyword_matcher import KeywordMatcher, load_vocabulary
 
 logger = logging.getLogger(__name__)
 
+# Words that end a noun phrase when walking back from its noun
+PHRASE_BREAKS = {
+    "a", "an", "the", "and", "or", "but", "with", "without", "by", "at", "in", "on", "over",
+    "under", "near", "of", "to", "from", "through", "across", "into", "around", "above",
+    "below", "behind", "beside", "between", "beneath", "along", "is", "are", "was", "were",
+    "it", "its", "there", "that", "this", "these", "those", "some", "where", "while", "looks",
+}
+# Words outside the lexicons a phrase may take in before its noun ("pine" in "tall pine trees")
+MAX_UNTAGGED = 2
+
 class PromptParser:
-    def __init__(self):
-        pass
+    """
+    Extracts the promptable language from a transcript without a network
+    round trip. Filler and request phrasing ("um, can you make me, like...")
+    is stripped, then landscape nouns, modifiers, time of day and weather
+    are picked out with lexicons from vocabulary.json. If a spaCy model is
+    configured, its part-of-speech tags fill in nouns and adjectives the
+    lexicons miss.
+    """
+
+    def __init__(self, config=None):
+        settings = (config or {}).get('prompt_parser', {})
+        vocabulary = load_vocabulary()
+
+        self.fillers = KeywordMatcher({phrase: '' for phrase in vocabulary.get('fillers', [])})
+        self.landscape = KeywordMatcher({word: word for word in vocabulary.get('landscape', [])})
+        self.modifiers = KeywordMatcher({word: word for word in vocabulary.get('modifiers', [])})
+        self.time_of_day = KeywordMatcher(vocabulary.get('time_of_day', {}))
+        self.weather = KeywordMatcher(vocabulary.get('weather', {}))
+
+        self.nlp = None
+        model = settings.get('spacy_model')
+        if model:
+            try:
+                import spacy
+                self.nlp = spacy.load(model, disable=['parser', 'ner', 'lemmatizer'])
+            except Exception as e:
+                logger.warning(f"spaCy model {model} unavailable, using rules only: {str(e)}")
+
+        if settings.get('warmup', True):
+            self.warmup()
+
+    def warmup(self):
+        """Run one extraction so the first visitor doesn't pay for lazy setup"""
+        started = time.time()
+        self.extract("um, can you show me misty mountains at dusk with a quiet lake")
+        logger.info(f"Prompt parser warmed up in {(time.time() - started) * 1000:.1f} ms")
 
     def parse(self, text):
         """
         Parse transcribed text to extract relevant landscape description
         and enhance it for image generation
         """
+        return self.parse_batch([text])[0]
+
+    def parse_batch(self, texts):
+        """Parse several transcripts at once; spaCy tags them in one batch"""
         try:
-            if not text:
-                return None
-                
-            # Simple enhancement of the input text
-            prompt = f"A cinematic landscape scene of {text}, photorealistic style, professional photography"
-            print(f"Enhanced prompt: {prompt}")
-            return prompt
-                
+            scenes = self.extract_batch(texts)
+            prompts = []
+            for scene in scenes:
+                prompt = self.build_prompt(scene) if scene else None
+                if prompt:
+                    print(f"Enhanced prompt: {prompt}")
+                prompts.append(prompt)
+            return prompts
+
         except Exception as e:
             logger.error(f"Error parsing text: {str(e)}")
-            return None
+            return [None] * len(texts)
+
+    def extract(self, text):
+        return self.extract_batch([text])[0]
+
+    def extract_batch(self, texts):
+        """
+        Return one scene dict per text: subject (the cleaned description),
+        nouns, modifiers, time_of_day and weather; None for empty text
+        """
+        subjects = [self.clean_text(text) if text else '' for text in texts]
+        tagged = [None] * len(texts)
+        if self.nlp is not None:
+            for index, doc in enumerate(self.nlp.pipe(subjects)):
+                tagged[index] = doc
+
+        scenes = []
+        for subject, doc in zip(subjects, tagged):
+            if not subject:
+                scenes.append(None)
+                continue
+
+            nouns = self.landscape.find_all(subject)
+            modifiers = self.modifiers.find_all(subject)
+            if doc is not None:
+                for token in doc:
+                    if token.pos_ in ('NOUN', 'PROPN') and token.text not in nouns:
+                        nouns.append(token.text)
+                    elif token.pos_ == 'ADJ' and token.text not in modifiers:
+                        modifiers.append(token.text)
+
+            scenes.append({
+                "subject": subject,
+                "nouns": nouns,
+                "modifiers": modifiers,
+                "time_of_day": [self.time_of_day.values[key] for key in self.time_of_day.find_all(subject)],
+                "weather": [self.weather.values[key] for key in self.weather.find_all(subject)]
+            })
+        return scenes
+
+    def build_prompt(self, scene):
+        """
+        Turn an extracted scene into the image prompt. When the noun
+        phrases found in the subject account for all of its content words,
+        they become the subject; otherwise the whole cleaned subject is
+        kept so no word the lexicons miss is lost. Modifiers standing
+        alone, time of day and weather follow as details unless the
+        subject already says them.
+        """
+        phrases, loose = self.noun_phrases(scene)
+        subject = scene["subject"]
+        if phrases and self._covers(subject, phrases, loose):
+            subject = self._join(phrases)
+
+        details = []
+        for phrase in loose + scene["time_of_day"] + scene["weather"]:
+            if phrase not in details and not re.search(rf"\b{re.escape(phrase)}\b", subject):
+                details.append(phrase)
+
+        prompt = f"A cinematic landscape scene of {subject}"
+        if details:
+            prompt += f", {', '.join(details)}"
+        return f"{prompt}, photorealistic style, professional photography"
+
+    def _covers(self, subject, phrases, loose):
+        """Whether the phrases and details account for every content word of subject"""
+        covered = set(" ".join(phrases + loose).split())
+        for matcher in (self.time_of_day, self.weather):
+            covered.update(" ".join(matcher.find_all(subject)).split())
+        return all(word in covered or word in PHRASE_BREAKS for word in subject.split())
+
+    def noun_phrases(self, scene):
+        """
+        Group the scene's nouns with the words in front of them, in
+        transcript order: "tall pine trees by a quiet lake" gives
+        ["tall pine trees", "quiet lake"]. A phrase takes in modifiers and
+        up to MAX_UNTAGGED other words before its noun, stopping at
+        articles, prepositions and the like. Returns (phrases, modifiers
+        that are in no phrase).
+        """
+        words = scene["subject"].split()
+        kinds = [None] * len(words)
+        for kind, terms in (('modifier', scene["modifiers"]), ('noun', scene["nouns"])):
+            for term in terms:
+                length = len(term.split())
+                for index in range(len(words) - length + 1):
+                    if " ".join(words[index:index + length]) == term:
+                        kinds[index:index + length] = [kind] * length
+
+        phrases = []
+        used = [False] * len(words)
+        index = 0
+        while index < len(words):
+            if kinds[index] != 'noun':
+                index += 1
+                continue
+            end = index
+            while end + 1 < len(words) and kinds[end + 1] == 'noun':
+                end += 1
+            start, untagged = index, 0
+            while start > 0 and not used[start - 1] and words[start - 1] not in PHRASE_BREAKS:
+                if kinds[start - 1] is None:
+                    if untagged == MAX_UNTAGGED:
+                        break
+                    untagged += 1
+                start -= 1
+            # Untagged words only count when a modifier or noun follows them
+            while kinds[start] is None:
+                start += 1
+            phrases.append(" ".join(words[start:end + 1]))
+            used[start:end + 1] = [True] * (end + 1 - start)
+            index = end + 1
+
+        loose = [term for term in scene["modifiers"] if not any(
+            used[index] for index, word in enumerate(words) if word == term.split()[0]
+        )]
+        return list(dict.fromkeys(phrases)), loose
+
+    @staticmethod
+    def _join(phrases):
+        if len(phrases) == 1:
+            return phrases[0]
+        return f"{', '.join(phrases[:-1])} and {phrases[-1]}"
 
     def clean_text(self, text):
         """Remove unnecessary words and normalize text"""
-        return text.strip().lower()
+        text = re.sub(r"[^\w\s'-]", " ", text.strip().lower())
+        text = self.fillers.replace(text)
+        text = " ".join(text.split())
+        # Discourse markers that are content words mid-sentence ("looks
+        # like rain", "a well in the desert") are only dropped up front
+        text = re.sub(r"^(?:(?:so|well|like|just|really|and)\s+)+", "", text)
+        # Drop dangling connectives left behind by removed filler
+        return re.sub(r"^(?:and|with|of|to|the)\s+|\s+(?:and|with|of|to|a|an|the)$", "", text)
@@ -1,7 +1,10 @@
-import json
 import os
+import time
 import logging
+from collections import Counter, deque
 from threading import Lock
+from journal import Journal
+from video_catalog import VideoCatalog
 
 logger = logging.getLogger(__name__)
 
@@ -10,75 +13,202 @@ class QueueManager:
         self.queue_file = config['video_queue_file']
         self.fallback_videos = config['fallback_videos']
         self.lock = Lock()
-        
-        # Initialize queue file if it doesn't exist
-        if not os.path.exists(self.queue_file):
-            self._save_queue([])
 
-    def add_video(self, video_path):
-        """Add a new video to the queue"""
+        # The in-memory queue is the source of truth. Removals leave a
+        # tombstone that is skipped when it reaches the head, so every
+        # operation is O(1); changes are journaled for crash safety.
+        self.queue = deque()
+        self.counts = Counter()
+        self.removed = Counter()
+        self.length = 0
+        # When each live entry was added, oldest first per path, so the
+        # player can measure time-to-screen; None for entries replayed
+        # from the journal
+        self.added_at = {}
+        self.journal = Journal(
+            self.queue_file,
+            compact_every=config.get('queue_compact_every', 500),
+            fsync=config.get('queue_fsync', True)
+        )
+        self._load_queue()
+
+        # Every clip ever generated, used for replays when the queue is empty
+        self.catalog = VideoCatalog(config)
+
+        # Callbacks notified when a clip is added
+        self.subscribers = []
+
+        # Clips the player has been handed or is showing, which must not
+        # be deleted to free disk space
+        self.playing = None
+        self.handed_out = deque(maxlen=config.get('handed_out_window', 2))
+
+    def add_video(self, video_path, metadata=None):
+        """Add a new video to the queue and the catalog"""
         try:
             with self.lock:
-                queue = self._load_queue()
-                queue.append(video_path)
-                self._save_queue(queue)
+                self._apply({"op": "add", "path": video_path})
                 logger.info(f"Added video to queue: {video_path}")
-                return True
+            # A cached clip queued again keeps its play history
+            if self.catalog.get(video_path) is None:
+                self.catalog.add(video_path, **(metadata or {}))
+            self._notify(video_path)
+            return True
         except Exception as e:
             logger.error(f"Error adding video to queue: {str(e)}")
             return False
 
     def get_next_video(self):
-        """Get the next video from the queue"""
+        """
+        Get the next video from the queue. When the queue is empty a clip
+        is chosen from the catalog instead, so repeated calls may differ.
+        """
         try:
             with self.lock:
-                queue = self._load_queue()
-                if not queue:
-                    # Return a fallback video if queue is empty
-                    return self._get_fallback_video()
-                    
-                # Get next video and verify it exists
-                video_path = queue[0]
-                if not os.path.exists(video_path):
+                video_path = self._head()
+
+                # Verify the next video exists
+                if video_path is not None and not os.path.exists(video_path):
                     logger.warning(f"Video file not found: {video_path}")
-                    queue.pop(0)  # Remove missing video
-                    self._save_queue(queue)
-                    return self._get_fallback_video()
-                    
-                return video_path
-                
+                    self._apply({"op": "remove", "path": video_path})  # Remove missing video
+                    video_path = None
+
+                if video_path is None:
+                    # Replay from the catalog, then fall back to the stock videos
+                    video_path = self.catalog.next_video() or self._get_fallback_video()
+                self.handed_out.append(video_path)
+            return video_path
+
         except Exception as e:
             logger.error(f"Error getting next video: {str(e)}")
             return self._get_fallback_video()
 
+    def mark_played(self, video_path):
+        """Record that a video has been shown"""
+        self.catalog.mark_played(video_path)
+
+    def video_started(self, video_path):
+        """
+        Called by the player when a clip appears on screen. Removes it from
+        the queue, records the play and returns the seconds since it was
+        queued, or None if it was a replay or fallback.
+        """
+        with self.lock:
+            self.playing = video_path
+            added_at = None
+            if self.counts[video_path] > 0:
+                # The entry nearest the head is the one being shown
+                added_at = self.added_at[video_path][0]
+                self._apply({"op": "remove", "path": video_path})
+        self.mark_played(video_path)
+        return time.time() - added_at if added_at else None
+
+    def is_queued(self, video_path):
+        """Whether a clip is waiting in the queue"""
+        with self.lock:
+            return self.counts[video_path] > 0
+
+    def release_video(self, video_path):
+        """
+        Drop a clip from the catalog so its file can be deleted. Returns
+        False, leaving it alone, if it is queued or with the player.
+        """
+        with self.lock:
+            if self.counts[video_path] > 0 or video_path == self.playing or video_path in self.handed_out:
+                return False
+            self.catalog.remove(video_path)
+            return True
+
+    def subscribe(self, callback):
+        """Call callback(video_path) whenever a video is added"""
+        self.subscribers.append(callback)
+
+    def _notify(self, video_path):
+        for callback in list(self.subscribers):
+            try:
+                callback(video_path)
+            except Exception as e:
+                logger.error(f"Error notifying queue subscriber: {str(e)}")
+
     def remove_video(self, video_path):
         """Remove a video from the queue"""
         try:
             with self.lock:
-                queue = self._load_queue()
-                if video_path in queue:
-                    queue.remove(video_path)
-                    self._save_queue(queue)
+                if self.counts[video_path] > 0:
+                    self._apply({"op": "remove", "path": video_path})
                     logger.info(f"Removed video from queue: {video_path}")
                 return True
         except Exception as e:
             logger.error(f"Error removing video from queue: {str(e)}")
             return False
 
+    def _apply(self, record, replay=False):
+        """Apply one change to the in-memory queue and journal it"""
+        path = record["path"]
+        if record["op"] == "add":
+            self.queue.append(path)
+            self.counts[path] += 1
+            self.length += 1
+            self.added_at.setdefault(path, deque()).append(None if replay else time.time())
+        elif record["op"] == "remove" and self.counts[path] > 0:
+            self.counts[path] -= 1
+            if not self.counts[path]:
+                del self.counts[path]
+            # Removal tombstones the entry nearest the head
+            times = self.added_at[path]
+            times.popleft()
+            if not times:
+                del self.added_at[path]
+            self.removed[path] += 1
+            self.length -= 1
+
+        if not replay:
+            self.journal.append(record)
+            if self.journal.should_compact():
+                self._save_queue()
+
+    def _head(self):
+        """Return the first live entry, discarding tombstoned ones"""
+        while self.queue:
+            path = self.queue[0]
+            if not self.removed[path]:
+                return path
+            self.queue.popleft()
+            self.removed[path] -= 1
+            if not self.removed[path]:
+                del self.removed[path]
+        return None
+
+    def _live_entries(self):
+        """Queue contents without tombstoned entries"""
+        removed = Counter(self.removed)
+        entries = []
+        for path in self.queue:
+            if removed[path]:
+                removed[path] -= 1
+            else:
+                entries.append(path)
+        return entries
+
     def _load_queue(self):
-        """Load the queue from file"""
+        """Load the snapshot, replay the journal and compact"""
         try:
-            with open(self.queue_file, 'r') as f:
-                return json.load(f)
+            snapshot, records = self.journal.load(default=[])
+            for path in snapshot or []:
+                self._apply({"op": "add", "path": path}, replay=True)
+            for record in records:
+                self._apply(record, replay=True)
         except Exception as e:
             logger.error(f"Error loading queue: {str(e)}")
-            return []
+        self._save_queue()
 
-    def _save_queue(self, queue):
-        """Save the queue to file"""
+    def _save_queue(self):
+        """Write a compact snapshot of the queue"""
         try:
-            with open(self.queue_file, 'w') as f:
-                json.dump(queue, f)
+            entries = self._live_entries()
+            self.queue = deque(entries)
+            self.removed.clear()
+            self.journal.compact(entries)
         except Exception as e:
             logger.error(f"Error saving queue: {str(e)}")
 
@@ -92,9 +222,5 @@ class QueueManager:
 
     def get_queue_length(self):
         """Get the current length of the queue"""
-        try:
-            with self.lock:
-                return len(self._load_queue())
-        except Exception as e:
-            logger.error(f"Error getting queue length: {str(e)}")
-            return 0
+        with self.lock:
+            return self.length
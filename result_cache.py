@@ -0,0 +1,198 @@
+import os
+import re
+import math
+import time
+import random
+import hashlib
+import logging
+from collections import Counter, OrderedDict
+from threading import Lock
+from journal import Journal
+
+logger = logging.getLogger(__name__)
+
+STOP_WORDS = {
+    "a", "an", "the", "of", "with", "and", "in", "on", "at", "to", "some",
+    "i", "i'd", "id", "want", "like", "see", "show", "me", "please", "there",
+    "is", "are", "be", "um", "uh", "just", "really", "very", "maybe", "lots",
+}
+
+
+def normalize(text):
+    """Lowercase, strip punctuation and filler words"""
+    words = re.findall(r"[a-z0-9']+", (text or "").lower())
+    return " ".join(word for word in words if word not in STOP_WORDS)
+
+
+def cache_key(normalized):
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:32]
+
+
+def ngram_vector(normalized, n=3):
+    """Character n-gram counts and their norm, for near-duplicate matching"""
+    padded = f" {normalized} "
+    grams = Counter(padded[i:i + n] for i in range(max(1, len(padded) - n + 1)))
+    return grams, math.sqrt(sum(count * count for count in grams.values()))
+
+
+def cosine(a, b):
+    """Cosine similarity of two ngram_vector() results"""
+    (grams, norm), (other, other_norm) = a, b
+    if not norm or not other_norm:
+        return 0.0
+    return sum(count * other.get(gram, 0) for gram, count in grams.items()) / (norm * other_norm)
+
+
+def similarity(text_a, text_b):
+    """Trigram cosine similarity of two texts after normalizing them"""
+    return cosine(ngram_vector(normalize(text_a)), ngram_vector(normalize(text_b)))
+
+
+class ResultCache:
+    """
+    Maps a normalized scene description to the clips already generated for
+    it, so a repeated request can be queued at once instead of paying for
+    another DALL-E and Runway round trip.
+
+    Exact matches use a hash of the normalized text; optionally, the most
+    similar cached description by character-trigram cosine is accepted
+    above a threshold. Each entry keeps up to max_variants clips, and a
+    hit returns one at random. Entries are evicted least recently used
+    past max_entries, and variants expire after max_age_seconds.
+    """
+
+    def __init__(self, config):
+        settings = config.get('result_cache', {})
+        self.enabled = settings.get('enabled', True)
+        self.max_entries = settings.get('max_entries', 500)
+        self.max_age = settings.get('max_age_seconds', 7 * 24 * 3600)
+        self.max_variants = settings.get('max_variants', 3)
+        # Near-duplicate matching is off by default: trigrams can't tell
+        # "calm ocean at night" from "stormy ocean at night"
+        self.similarity = settings.get('similarity', 0)
+        # Chance that a hit on an entry with spare variant slots is treated
+        # as a miss, so popular scenes slowly gain fresh variants
+        self.variant_chance = settings.get('variant_chance', 0.0)
+
+        self.lock = Lock()
+        self.entries = OrderedDict()
+        self.vectors = {}
+        self.journal = Journal(
+            settings.get('cache_file', 'result_cache.json'),
+            compact_every=settings.get('compact_every', 500),
+            fsync=config.get('queue_fsync', True)
+        )
+        self._load_cache()
+
+    def lookup(self, text):
+        """Return a cached {"video_path", "image_path", ...} variant for text, or None"""
+        if not self.enabled:
+            return None
+        normalized = normalize(text)
+        if not normalized:
+            return None
+
+        with self.lock:
+            key = cache_key(normalized)
+            if key not in self.entries and self.similarity:
+                key = self._nearest(normalized)
+            if key is None or key not in self.entries:
+                return None
+
+            variants = self._live_variants(key)
+            if not variants:
+                return None
+            if len(variants) < self.max_variants and random.random() < self.variant_chance:
+                return None
+
+            self.entries.move_to_end(key)
+            self._apply({"op": "hit", "key": key, "at": time.time()})
+            logger.info(f"Result cache hit for '{normalized}' -> '{self.entries[key]['text']}'")
+            return dict(random.choice(variants))
+
+    def store(self, text, video_path, image_path=None):
+        """Remember a generated clip for text"""
+        if not self.enabled or not video_path:
+            return
+        normalized = normalize(text)
+        if not normalized:
+            return
+
+        with self.lock:
+            self._apply({
+                "op": "store",
+                "key": cache_key(normalized),
+                "text": normalized,
+                "variant": {"video_path": video_path, "image_path": image_path, "created_at": time.time()}
+            })
+            while len(self.entries) > self.max_entries:
+                oldest = next(iter(self.entries))
+                self._apply({"op": "drop", "key": oldest})
+
+    def _nearest(self, normalized):
+        vector = ngram_vector(normalized)
+        best_key, best_score = None, self.similarity
+        for key, other in self.vectors.items():
+            score = cosine(vector, other)
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def _live_variants(self, key):
+        """Variants whose files still exist and have not expired"""
+        now = time.time()
+        entry = self.entries[key]
+        live = [
+            variant for variant in entry["variants"]
+            if now - variant["created_at"] <= self.max_age and os.path.exists(variant["video_path"])
+        ]
+        if len(live) != len(entry["variants"]):
+            if live:
+                self._apply({"op": "set", "key": key, "variants": live})
+            else:
+                self._apply({"op": "drop", "key": key})
+        return live
+
+    def _apply(self, record, replay=False):
+        """Apply one change to the in-memory cache and journal it"""
+        op, key = record["op"], record["key"]
+        if op == "store":
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = {"text": record["text"], "variants": [], "last_hit": None}
+                self.vectors[key] = ngram_vector(record["text"])
+            entry["variants"].append(record["variant"])
+            del entry["variants"][:-self.max_variants]
+            self.entries.move_to_end(key)
+        elif op == "hit" and key in self.entries:
+            self.entries[key]["last_hit"] = record["at"]
+            self.entries.move_to_end(key)
+        elif op == "set" and key in self.entries:
+            self.entries[key]["variants"] = record["variants"]
+        elif op == "drop":
+            self.entries.pop(key, None)
+            self.vectors.pop(key, None)
+
+        if not replay:
+            self.journal.append(record)
+            if self.journal.should_compact():
+                self._save_cache()
+
+    def _load_cache(self):
+        """Load the snapshot (least recently used first), replay the journal and compact"""
+        try:
+            snapshot, records = self.journal.load(default=[])
+            for key, entry in snapshot or []:
+                self.entries[key] = entry
+                self.vectors[key] = ngram_vector(entry["text"])
+            for record in records:
+                self._apply(record, replay=True)
+        except Exception as e:
+            logger.error(f"Error loading result cache: {str(e)}")
+        self._save_cache()
+
+    def _save_cache(self):
+        try:
+            self.journal.compact(list(self.entries.items()))
+        except Exception as e:
+            logger.error(f"Error saving result cache: {str(e)}")
@@ -0,0 +1,348 @@
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from http_client import get_client
+from journal import Journal
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+FAILED_STATUSES = {"FAILED", "CANCELED", "CANCELLED"}
+
+
+class TaskState:
+    """One Runway task being tracked by the poller"""
+
+    def __init__(self, task_id, meta, future=None, submitted_at=None):
+        self.task_id = task_id
+        self.meta = meta
+        self.future = future
+        self.submitted_at = submitted_at or time.time()
+        self.next_poll = 0.0
+        self.interval = 0.0
+        self.polling = False
+
+
+class RunwayTaskManager:
+    """
+    Submits image_to_video tasks and tracks every in-flight task with a
+    single asyncio poller on a background thread, so waiting on a job
+    costs no thread. Each due task is polled on its own, up to
+    poll_batch_size at once, so a slow request never holds up the other
+    tasks or the timeouts. The interval adapts to the reported status and
+    progress. At most max_concurrent tasks are in flight, matching the
+    Runway rate limit.
+
+    Each submit() returns a Future that resolves to finalize(outputs, meta),
+    or None on failure or timeout. Task IDs are journaled: a task that
+    outlives its caller's timeout, or the process, keeps being polled, and
+    its result goes to on_orphan(result, meta) instead.
+
+    The loop itself never blocks: finalize, resolving futures (whose
+    callbacks may wait on pipeline backpressure) and on_orphan run on a
+    worker pool, and journal writes go through a single writer thread in
+    the order the loop issued them.
+    """
+
+    def __init__(self, api_base, headers, finalize, config=None, on_orphan=None):
+        settings = (config or {}).get('runway', {})
+        self.api_base = api_base
+        self.headers = headers
+        self.finalize = finalize
+        self.on_orphan = on_orphan
+        self.max_concurrent = settings.get('max_concurrent', 3)
+        self.first_poll = settings.get('first_poll_seconds', 5.0)
+        self.min_interval = settings.get('min_poll_seconds', 1.0)
+        self.max_interval = settings.get('max_poll_seconds', 10.0)
+        self.batch_size = settings.get('poll_batch_size', 8)
+        self.task_timeout = settings.get('task_timeout', 120)
+        self.abandon_after = settings.get('abandon_after', 1800)
+
+        self.tasks = {}
+        # Poll coroutines in flight, referenced so they aren't collected
+        self.polls = set()
+        # Finished tasks whose outputs are still being downloaded
+        self.finalizing = {}
+        self.active = 0
+        self.workers = ThreadPoolExecutor(
+            max_workers=settings.get('finalize_workers', 4),
+            thread_name_prefix='runway-finalize'
+        )
+        self.journal_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='runway-journal')
+        self.journal = Journal(
+            settings.get('task_file', 'runway_tasks.json'),
+            compact_every=settings.get('task_compact_every', 100)
+        )
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name="runway-tasks", daemon=True)
+        self.started = threading.Event()
+        self.thread.start()
+        self.started.wait()
+        self._resume()
+
+    def submit(self, payload, meta=None):
+        """Submit a task; returns a Future for its finalized result"""
+        future = Future()
+        asyncio.run_coroutine_threadsafe(self._submit(payload, meta or {}, future), self.loop)
+        return future
+
+    def pending_tasks(self):
+        return len(self.tasks)
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self._shutdown)
+        self.thread.join(timeout=5)
+        # Unfinished downloads are journaled as pending and resumed next run
+        self.workers.shutdown(wait=False, cancel_futures=True)
+        self.journal_writer.shutdown(wait=True)
+        self.journal.close()
+
+    def _shutdown(self):
+        """Cancel the poller and any requests in flight, then stop the loop"""
+        for coroutine in asyncio.all_tasks(self.loop):
+            coroutine.cancel()
+        self.loop.call_soon(self.loop.stop)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.slot_freed = asyncio.Condition()
+        self.wakeup = asyncio.Event()
+        self.loop.create_task(self._poller())
+        self.started.set()
+        self.loop.run_forever()
+
+    def _resume(self):
+        """Pick up tasks that were still running when the process stopped"""
+        snapshot, records = self.journal.load(default={})
+        pending = dict(snapshot or {})
+        for record in records:
+            if record["op"] == "submit":
+                pending[record["task_id"]] = record["state"]
+            else:
+                pending.pop(record["task_id"], None)
+        self.journal.compact(pending)
+
+        if pending:
+            logger.info(f"Resuming {len(pending)} Runway task(s) from the last run")
+
+        def register():
+            for task_id, state in pending.items():
+                self._track(TaskState(task_id, state["meta"], submitted_at=state["submitted_at"]))
+            self.wakeup.set()
+
+        self.loop.call_soon_threadsafe(register)
+
+    async def _submit(self, payload, meta, future):
+        metrics = get_metrics()
+        job_id = meta.get("job_id")
+
+        # Wait for a free slot under the concurrency cap
+        with metrics.span('runway_slot_wait', job_id):
+            async with self.slot_freed:
+                await self.slot_freed.wait_for(lambda: self.active < self.max_concurrent)
+                self.active += 1
+
+        try:
+            http = get_client()
+            logger.info("Submitting image_to_video task to Runway...")
+            with metrics.span('runway_submit', job_id):
+                response = await asyncio.to_thread(
+                    http.post,
+                    f"{self.api_base}/image_to_video",
+                    headers=self.headers(),
+                    json=payload,
+                    timeout=(http.connect_timeout, 60)
+                )
+                if response.status_code != 200:
+                    logger.error(f"Runway create failed [{response.status_code}]: {response.text}")
+                    raise RuntimeError("Runway create failed")
+
+                task_id = response.json().get("id")
+                if not task_id:
+                    logger.error(f"No task id in response: {response.text}")
+                    raise RuntimeError("No task id")
+        except Exception as e:
+            logger.error(f"Error with Runway API: {str(e)}")
+            await self._release_slot()
+            self._resolve(future, None)
+            return
+
+        task = TaskState(task_id, meta, future)
+        self._write_journal(self.journal.append, {
+            "op": "submit",
+            "task_id": task_id,
+            "state": {"meta": meta, "submitted_at": task.submitted_at}
+        })
+        logger.info(f"Task created: {task_id}. Polling for completion...")
+        self._track(task)
+        self.wakeup.set()
+
+    def _track(self, task):
+        """Add a task to the poll schedule; resumed tasks already hold a slot"""
+        if task.future is None:
+            self.active += 1
+        task.interval = self.first_poll
+        task.next_poll = time.time() + self.first_poll
+        self.tasks[task.task_id] = task
+
+    async def _poller(self):
+        """Start a poll for each due task, sleeping until the next one is due or times out"""
+        while True:
+            now = time.time()
+            self._expire(now)
+
+            polling = sum(task.polling for task in self.tasks.values())
+            idle = [task for task in self.tasks.values() if not task.polling]
+            due = sorted(
+                (task for task in idle if task.next_poll <= now),
+                key=lambda task: task.next_poll
+            )[:max(0, self.batch_size - polling)]
+            for task in due:
+                task.polling = True
+                poll = self.loop.create_task(self._poll(task))
+                self.polls.add(poll)
+                poll.add_done_callback(self.polls.discard)
+
+            wake_at = [
+                task.submitted_at + self.task_timeout
+                for task in self.tasks.values() if task.future is not None
+            ]
+            if polling + len(due) < self.batch_size:
+                wake_at += [task.next_poll for task in idle if not task.polling]
+            timeout = max(0.0, min(wake_at) - time.time()) if wake_at else None
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _expire(self, now):
+        """Stop waiting on tasks past task_timeout; the paid job keeps being polled"""
+        for task in self.tasks.values():
+            if task.future is not None and now - task.submitted_at > self.task_timeout:
+                logger.error("Timed out waiting for Runway task to finish.")
+                future, task.future = task.future, None
+                self._resolve(future, None)
+
+    async def _poll(self, task):
+        try:
+            await self._poll_once(task)
+        finally:
+            task.polling = False
+            # A poll slot is free again
+            self.wakeup.set()
+
+    async def _poll_once(self, task):
+        if time.time() - task.submitted_at > self.abandon_after:
+            logger.error(f"Abandoning Runway task {task.task_id}")
+            await self._finish(task, None)
+            return
+
+        try:
+            http = get_client()
+            with get_metrics().span('runway_poll', task.meta.get("job_id")) as span:
+                response = await asyncio.to_thread(
+                    http.get,
+                    f"{self.api_base}/tasks/{task.task_id}",
+                    headers=self.headers(),
+                    timeout=(http.connect_timeout, 30)
+                )
+                span['http_status'] = response.status_code
+            if response.status_code != 200:
+                logger.warning(f"Task poll failed [{response.status_code}]: {response.text}")
+                self._reschedule(task, None)
+                return
+            data = response.json()
+        except Exception as e:
+            logger.warning(f"Task poll failed: {str(e)}")
+            self._reschedule(task, None)
+            return
+
+        status = data.get("status")
+        if status == "SUCCEEDED":
+            outputs = data.get("output") or []
+            if not outputs:
+                logger.error(f"Task succeeded but no outputs: {str(data)[:500]}")
+            await self._finish(task, outputs or None)
+        elif status in FAILED_STATUSES:
+            logger.error(f"Runway task ended with status: {status}")
+            await self._finish(task, None)
+        else:
+            self._reschedule(task, data)
+
+    def _reschedule(self, task, data):
+        """Adapt the poll interval to how far along the task is"""
+        progress = (data or {}).get("progress")
+        elapsed = time.time() - task.submitted_at
+        if data and data.get("status") == "RUNNING" and progress:
+            # Aim to poll about halfway through the estimated remaining time
+            remaining = elapsed / progress * (1 - progress)
+            interval = remaining / 2
+        else:
+            # Queued, throttled or unknown: back off gradually
+            interval = task.interval * 1.5
+        task.interval = min(self.max_interval, max(self.min_interval, interval))
+        task.next_poll = time.time() + task.interval
+
+    async def _finish(self, task, outputs=None):
+        """Stop polling a task and free its slot; outputs are finalized off the loop"""
+        self.tasks.pop(task.task_id, None)
+        self.finalizing[task.task_id] = task
+        await self._release_slot()
+        self.workers.submit(self._deliver, task, outputs)
+
+    def _deliver(self, task, outputs):
+        """Worker thread: download the outputs and hand the result over"""
+        result = None
+        if outputs:
+            try:
+                result = self.finalize(outputs, task.meta)
+            except Exception as e:
+                logger.error(f"Error finalizing Runway task {task.task_id}: {str(e)}")
+
+        get_metrics().record_span('runway_task', time.time() - task.submitted_at, task.submitted_at, {
+            "job_id": task.meta.get("job_id"),
+            "task_id": task.task_id,
+            "status": "ok" if result is not None else "failed"
+        })
+        # Journaled once the download is on disk, so a crash before that
+        # resumes the task next run
+        self.loop.call_soon_threadsafe(self._journal_done, task)
+
+        try:
+            if task.future is not None:
+                task.future.set_result(result)
+            elif result is not None and self.on_orphan:
+                self.on_orphan(result, task.meta)
+        except Exception as e:
+            logger.error(f"Error delivering Runway task {task.task_id}: {str(e)}")
+
+    def _journal_done(self, task):
+        self.finalizing.pop(task.task_id, None)
+        self._write_journal(self.journal.append, {"op": "done", "task_id": task.task_id})
+        if self.journal.should_compact():
+            # Snapshot taken on the loop, written after every earlier record
+            self._write_journal(self.journal.compact, {
+                t.task_id: {"meta": t.meta, "submitted_at": t.submitted_at}
+                for t in list(self.tasks.values()) + list(self.finalizing.values())
+            })
+
+    def _write_journal(self, write, data):
+        def run():
+            try:
+                write(data)
+            except Exception as e:
+                logger.error(f"Error writing Runway task journal: {str(e)}")
+        self.journal_writer.submit(run)
+
+    async def _release_slot(self):
+        async with self.slot_freed:
+            self.active -= 1
+            self.slot_freed.notify()
+
+    def _resolve(self, future, result):
+        # Resolve off the loop so done-callbacks may block
+        self.workers.submit(future.set_result, result)
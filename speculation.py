@@ -0,0 +1,168 @@
+import os
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from artifact_store import new_id
+from metrics import get_metrics
+from result_cache import normalize, similarity
+
+logger = logging.getLogger(__name__)
+
+
+class Speculation:
+    """One image generation started from a partial transcript"""
+
+    def __init__(self, text, future, artifact_id=None):
+        self.text = text
+        self.future = future
+        # Names the image file like a job's, and links it to the job that claims it
+        self.artifact_id = artifact_id
+        self.launched_at = time.time()
+        self.finished_at = None
+
+
+class SpeculativeImages:
+    """
+    Starts image generation while the visitor is still speaking, from the
+    part of the transcript that has stopped changing. When the final
+    transcript arrives it is compared with the speculative one: if they are
+    similar enough the image is reused, otherwise the job is cancelled if
+    it has not started, or its image is discarded when it finishes.
+
+    Launches are capped per minute to bound the extra API spend. Outcomes
+    and latency saved are counted in the metrics registry as
+    fov_speculative_total{outcome} and fov_speculative_saved_seconds, and
+    summarized by stats().
+    """
+
+    def __init__(self, config, parse, generate):
+        settings = config.get('speculative', {})
+        self.enabled = settings.get('enabled', False)
+        self.min_words = settings.get('min_words', 4)
+        self.similarity = settings.get('similarity', 0.8)
+        self.max_per_minute = settings.get('max_per_minute', 4)
+
+        self.parse = parse
+        self.generate = generate
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.get('workers', 1),
+            thread_name_prefix='speculative'
+        )
+        self.lock = Lock()
+        self.current = None
+        self.last_partial = None
+        self.launches = deque()
+        self.counts = {"launched": 0, "hits": 0, "misses": 0, "discarded": 0, "rate_limited": 0}
+        self.latency_saved = 0.0
+
+    def on_partial(self, text, stable_text):
+        """Feed a streaming transcription update; may launch a speculative image"""
+        if not self.enabled:
+            return
+
+        # Committed text is final; otherwise take a partial that came back
+        # unchanged from the previous pass
+        candidate = stable_text
+        if len(normalize(candidate).split()) < self.min_words and text == self.last_partial:
+            candidate = text
+        self.last_partial = text
+        if len(normalize(candidate).split()) < self.min_words:
+            return
+
+        with self.lock:
+            if self.current is not None:
+                if similarity(self.current.text, candidate) >= self.similarity:
+                    return
+                self._discard(self.current)
+                self.current = None
+
+            now = time.time()
+            while self.launches and now - self.launches[0] > 60:
+                self.launches.popleft()
+            if len(self.launches) >= self.max_per_minute:
+                self._count("rate_limited")
+                return
+
+            self.launches.append(now)
+            self._count("launched")
+            logger.info(f"Speculatively generating image for: {candidate}")
+            self.current = self._launch(candidate)
+
+    def claim(self, final_text):
+        """
+        Hand over the speculative image for the final transcript. Returns
+        the Speculation, whose future gives the image path, or None if
+        there is no usable speculation.
+        """
+        self.last_partial = None
+        with self.lock:
+            speculation, self.current = self.current, None
+            if speculation is None:
+                return None
+
+            if similarity(speculation.text, final_text) < self.similarity:
+                logger.info(f"Discarding speculative image for: {speculation.text}")
+                self._count("misses")
+                self._discard(speculation)
+                return None
+
+            self._count("hits")
+            # Time the image had already been generating, up to its total
+            finished = speculation.finished_at or time.time()
+            saved = finished - speculation.launched_at
+            self.latency_saved += saved
+            get_metrics().observe('fov_speculative_saved_seconds', saved)
+            return speculation
+
+    def discard(self, speculation):
+        """Throw away a claimed image that turned out not to be needed"""
+        with self.lock:
+            self._count("discarded")
+        self._discard(speculation)
+
+    def stats(self):
+        with self.lock:
+            decided = self.counts["hits"] + self.counts["misses"]
+            return dict(
+                self.counts,
+                hit_rate=self.counts["hits"] / decided if decided else 0.0,
+                latency_saved_seconds=round(self.latency_saved, 3)
+            )
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _count(self, outcome):
+        self.counts[outcome] += 1
+        get_metrics().inc('fov_speculative_total', outcome=outcome)
+
+    def _launch(self, text):
+        artifact_id = new_id()
+        future = self.executor.submit(self._generate, text, artifact_id)
+        speculation = Speculation(text, future, artifact_id)
+        future.add_done_callback(lambda _: setattr(speculation, 'finished_at', time.time()))
+        return speculation
+
+    def _generate(self, text, artifact_id):
+        prompt = self.parse(text)
+        if not prompt:
+            return None
+        return self.generate(prompt, artifact_id=artifact_id)
+
+    @staticmethod
+    def _discard(speculation):
+        """Cancel a job that has not started, or delete its image once done"""
+        if speculation.future.cancel():
+            return
+
+        def remove(future):
+            try:
+                path = future.result()
+                if path and os.path.exists(path):
+                    os.remove(path)
+            except Exception as e:
+                logger.warning(f"Could not discard speculative image: {str(e)}")
+
+        speculation.future.add_done_callback(remove)
@@ -0,0 +1,187 @@
+import os
+import time
+import logging
+import threading
+from artifact_store import id_time
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Eviction order: intermediates first, then clips
+CLIP_KINDS = ('video', 'local_video')
+INTERMEDIATE_KINDS = ('image',)
+
+
+class StorageManager:
+    """
+    Keeps generated images and videos under a byte budget.
+
+    The size of every file in the ArtifactIndex is tallied at startup and
+    kept current as files are recorded, so the tree is never rescanned.
+    Once the tally passes max_gb, files are deleted until it is back under
+    low_water of the budget. Source images go first, oldest first. Then
+    clips go in least recently played order, along with their thumbnails.
+    Files younger than min_age_seconds are kept, and so are clips that
+    QueueManager reports as queued or with the player.
+    """
+
+    def __init__(self, config, artifacts, queue_manager):
+        settings = config.get('storage', {})
+        self.enabled = settings.get('enabled', True)
+        self.max_bytes = int(settings.get('max_gb', 20) * 1e9)
+        self.low_water = settings.get('low_water', 0.9)
+        self.min_age = settings.get('min_age_seconds', 900)
+        # Images older than this are deleted even under budget; None keeps them
+        self.image_retention = settings.get('image_retention_seconds')
+
+        self.artifacts = artifacts
+        self.queue_manager = queue_manager
+        self.lock = threading.Lock()
+        # path -> (artifact_id, kind, size)
+        self.files = {}
+        self.total = 0
+        self.evicted = {"files": 0, "bytes": 0}
+        self._load_tally()
+
+        self.running = False
+        self.wakeup = threading.Event()
+        self.thread = None
+        if self.enabled:
+            artifacts.subscribe(self._on_file)
+            self.running = True
+            self.thread = threading.Thread(target=self._run, name="storage", daemon=True)
+            self.thread.start()
+            # Catch up on anything that accumulated before the budget was set
+            self.wakeup.set()
+
+    def stats(self):
+        with self.lock:
+            return {"bytes": self.total, "files": len(self.files), "evicted": dict(self.evicted)}
+
+    def close(self):
+        self.running = False
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def enforce(self):
+        """Apply the retention policy, then evict until under budget"""
+        now = time.time()
+        if self.image_retention:
+            for path, artifact_id, kind in self._candidates(now, kinds=INTERMEDIATE_KINDS):
+                if now - self._created_at(artifact_id) >= self.image_retention:
+                    self._evict(path, artifact_id, kind)
+
+        with self.lock:
+            if self.total <= self.max_bytes:
+                return
+        target = self.max_bytes * self.low_water
+        for path, artifact_id, kind in self._candidates(now):
+            with self.lock:
+                if self.total <= target:
+                    break
+            if kind in CLIP_KINDS and not self.queue_manager.release_video(path):
+                continue
+            self._evict(path, artifact_id, kind)
+
+        with self.lock:
+            if self.total > self.max_bytes:
+                logger.warning(f"Storage still over budget after eviction: {self.total / 1e9:.2f} GB")
+
+    def _candidates(self, now, kinds=INTERMEDIATE_KINDS + CLIP_KINDS):
+        """Evictable (path, artifact_id, kind), least valuable first"""
+        with self.lock:
+            files = [(path, artifact_id, kind) for path, (artifact_id, kind, _) in self.files.items()]
+
+        ranked = []
+        for path, artifact_id, kind in files:
+            if kind not in kinds or now - self._created_at(artifact_id) < self.min_age:
+                continue
+            if kind in INTERMEDIATE_KINDS:
+                rank = (0, self._created_at(artifact_id))
+            else:
+                # Clips no longer in the catalog (e.g. retired previews) go first
+                entry = self.queue_manager.catalog.get(path)
+                rank = (1, (entry.last_played or entry.created_at) if entry else 0)
+            ranked.append((rank, path, artifact_id, kind))
+        ranked.sort()
+        return [(path, artifact_id, kind) for _, path, artifact_id, kind in ranked]
+
+    def _evict(self, path, artifact_id, kind):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not delete {path}: {str(e)}")
+            return
+        self._forget(path)
+        record = self.artifacts.get(artifact_id) or {}
+        evicted_at = time.time()
+        self.artifacts.record(artifact_id, **{
+            f"{key[:-len('_path')]}_evicted_at": evicted_at
+            for key, value in record.items() if key.endswith('_path') and value == path
+        })
+        logger.info(f"Evicted {kind} to stay within the storage budget: {path}")
+
+        if kind in CLIP_KINDS:
+            thumbnail = record.get("thumbnail_path")
+            if thumbnail and thumbnail in self.files:
+                self._evict(thumbnail, artifact_id, 'thumbnail')
+
+    def _forget(self, path):
+        with self.lock:
+            entry = self.files.pop(path, None)
+            if entry is None:
+                return
+            self.total -= entry[2]
+            self.evicted["files"] += 1
+            self.evicted["bytes"] += entry[2]
+        get_metrics().inc('fov_evicted_bytes_total', entry[2], kind=entry[1])
+
+    def _created_at(self, artifact_id):
+        try:
+            return id_time(artifact_id)
+        except Exception:
+            return 0
+
+    def _on_file(self, artifact_id, kind, path, size):
+        # A local fallback clip is recorded as both local_video and video;
+        # keying by path counts it once
+        with self.lock:
+            previous = self.files.get(path)
+            if previous is not None:
+                self.total -= previous[2]
+            self.files[path] = (artifact_id, kind, size)
+            self.total += size
+            over = self.total > self.max_bytes
+        if over or self.image_retention:
+            self.wakeup.set()
+
+    def _load_tally(self):
+        for artifact_id, record in self.artifacts.items():
+            for key, path in record.items():
+                if not key.endswith('_path') or not path:
+                    continue
+                kind = key[:-len('_path')]
+                # Cache hits reference another job's clip without a size
+                if f"{kind}_size" not in record or record.get(f"{kind}_evicted_at"):
+                    continue
+                previous = self.files.get(path)
+                if previous is not None:
+                    self.total -= previous[2]
+                self.files[path] = (artifact_id, kind, record[f"{kind}_size"])
+                self.total += record[f"{kind}_size"]
+        logger.info(f"Tracking {len(self.files)} generated files, {self.total / 1e9:.2f} GB")
+
+    def _run(self):
+        while self.running:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            if not self.running:
+                break
+            try:
+                self.enforce()
+            except Exception as e:
+                logger.error(f"Error enforcing storage budget: {str(e)}")
@@ -0,0 +1,48 @@
+import numpy as np
+from audio_listener import StreamResampler
+
+
+def resample(samples, src_rate, dst_rate, block):
+    resampler = StreamResampler(src_rate, dst_rate)
+    chunks = [resampler.push(samples[i:i + block]) for i in range(0, len(samples), block)]
+    chunks.append(resampler.flush())
+    return np.concatenate(chunks)
+
+
+def tone(frequency, rate, seconds=1.0):
+    t = np.arange(int(rate * seconds)) / rate
+    return np.sin(2 * np.pi * frequency * t).astype(np.float32)
+
+
+def test_output_length_follows_rate_ratio():
+    samples = tone(440, 48000)
+    out = resample(samples, 48000, 16000, 1024)
+    assert len(out) == 16000
+
+
+def test_block_size_does_not_change_output():
+    samples = tone(440, 44100)
+    whole = resample(samples, 44100, 16000, len(samples))
+    for block in [1, 37, 512, 4096]:
+        blocked = resample(samples, 44100, 16000, block)
+        assert len(blocked) == len(whole)
+        assert np.allclose(blocked, whole, atol=1e-5)
+
+
+def test_passband_tone_is_preserved():
+    out = resample(tone(440, 48000), 48000, 16000, 960)
+    expected = tone(440, 16000)
+    # Skip the filter's start-up and tail
+    middle = slice(100, -100)
+    assert np.max(np.abs(out[middle] - expected[middle])) < 0.05
+
+
+def test_tone_above_new_nyquist_is_attenuated():
+    out = resample(tone(12000, 48000), 48000, 16000, 960)
+    assert np.sqrt(np.mean(out[100:-100] ** 2)) < 0.05
+
+
+def test_same_rate_passes_samples_through():
+    samples = tone(440, 16000)
+    out = resample(samples, 16000, 16000, 333)
+    assert np.allclose(out, samples, atol=1e-6)
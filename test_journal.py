@@ -0,0 +1,115 @@
+import json
+from journal import Journal
+from queue_manager import QueueManager
+
+
+def queue_config(tmp_path):
+    return {
+        'video_queue_file': str(tmp_path / 'queue.json'),
+        'video_catalog_file': str(tmp_path / 'catalog.json'),
+        'fallback_videos': [],
+        'queue_fsync': False
+    }
+
+
+def test_journal_replays_records_after_snapshot(tmp_path):
+    path = str(tmp_path / 'state.json')
+    journal = Journal(path, fsync=False)
+    journal.append({"op": "add", "path": "a"})
+    journal.compact(["a"])
+    journal.append({"op": "add", "path": "b"})
+    journal.close()
+
+    snapshot, records = Journal(path).load(default=[])
+    assert snapshot == ["a"]
+    assert records == [{"op": "add", "path": "b"}]
+
+
+def test_journal_skips_records_already_in_snapshot(tmp_path):
+    # A crash between writing the snapshot and truncating the journal
+    path = str(tmp_path / 'state.json')
+    journal = Journal(path, fsync=False)
+    journal.append({"op": "add", "path": "a"})
+    journal.append({"op": "add", "path": "b"})
+    journal.close()
+    with open(path, 'w') as f:
+        json.dump({"seq": 1, "data": ["a"]}, f)
+
+    reloaded = Journal(path)
+    snapshot, records = reloaded.load(default=[])
+    assert snapshot == ["a"]
+    assert records == [{"op": "add", "path": "b"}]
+    assert reloaded.seq == 2
+
+
+def test_journal_continues_sequence_after_load(tmp_path):
+    path = str(tmp_path / 'state.json')
+    journal = Journal(path, fsync=False)
+    journal.append({"op": "add", "path": "a"})
+    journal.close()
+
+    reloaded = Journal(path, fsync=False)
+    reloaded.load(default=[])
+    reloaded.append({"op": "add", "path": "b"})
+    reloaded.close()
+    with open(f"{path}.journal") as f:
+        assert [json.loads(line)["seq"] for line in f] == [1, 2]
+
+
+def test_journal_skips_torn_line(tmp_path):
+    path = str(tmp_path / 'state.json')
+    journal = Journal(path, fsync=False)
+    journal.append({"op": "add", "path": "a"})
+    journal.close()
+    with open(f"{path}.journal", 'a') as f:
+        f.write('{"op": "add", "pa')
+
+    _, records = Journal(path).load(default=[])
+    assert records == [{"op": "add", "path": "a"}]
+
+
+def test_journal_loads_plain_snapshot(tmp_path):
+    path = tmp_path / 'state.json'
+    path.write_text(json.dumps(["a", "b"]))
+    snapshot, records = Journal(str(path)).load(default=[])
+    assert snapshot == ["a", "b"]
+    assert records == []
+
+
+def test_queue_remove_tombstones_nearest_entry(tmp_path):
+    queue = QueueManager(queue_config(tmp_path))
+    for path in ["a", "b", "a"]:
+        queue.add_video(path)
+    queue.remove_video("a")
+
+    assert queue.get_queue_length() == 2
+    assert queue.is_queued("a")
+    assert queue._live_entries() == ["b", "a"]
+    assert queue._head() == "b"
+    assert list(queue.queue) == ["b", "a"]
+    assert not queue.removed
+
+
+def test_queue_remove_of_unqueued_path_is_ignored(tmp_path):
+    queue = QueueManager(queue_config(tmp_path))
+    queue.add_video("a")
+    queue.remove_video("b")
+    queue.remove_video("a")
+    queue.remove_video("a")
+
+    assert queue.get_queue_length() == 0
+    assert queue._head() is None
+
+
+def test_queue_tombstones_survive_restart(tmp_path):
+    config = queue_config(tmp_path)
+    queue = QueueManager(config)
+    for path in ["a", "b", "c"]:
+        queue.add_video(path)
+    queue.remove_video("b")
+    queue.journal.close()
+
+    reloaded = QueueManager(config)
+    assert reloaded._live_entries() == ["a", "c"]
+    assert reloaded.get_queue_length() == 2
+    assert not reloaded.is_queued("b")
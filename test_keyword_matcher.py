@@ -0,0 +1,45 @@
+from keyword_matcher import KeywordMatcher
+
+
+def test_longest_keyword_matches_first():
+    matcher = KeywordMatcher({"beam": "ray", "beams": "rays", "sun": "star", "sunset": "dusk"})
+    assert matcher.find_all("sunset beams") == ["sunset", "beams"]
+    assert matcher.replace("sunset beams over the sun") == "dusk rays over the star"
+
+
+def test_longer_phrase_wins_over_its_prefix():
+    matcher = KeywordMatcher({"northern": "north", "northern lights": "aurora"})
+    assert matcher.replace("the northern lights glow") == "the aurora glow"
+    assert matcher.replace("the northern hills") == "the north hills"
+
+
+def test_matches_whole_words_only():
+    matcher = KeywordMatcher({"light": "glow", "sun": "star"})
+    assert matcher.find_all("sunlight and sunny skies") == []
+    assert matcher.find_all("light, sun!") == ["light", "sun"]
+    assert matcher.replace("sunlight in the light") == "sunlight in the glow"
+
+
+def test_no_match_inside_longer_word():
+    # Neither keyword ends on a word boundary inside "beamsx"
+    matcher = KeywordMatcher({"beam": "ray", "beams": "rays"})
+    assert matcher.find_all("beamsx beam") == ["beam"]
+
+
+def test_phrases_match_any_whitespace_and_case():
+    matcher = KeywordMatcher({"Pine  Forest": "woods"})
+    assert list(matcher.values) == ["pine forest"]
+    assert matcher.find_all("a PINE\n  forest") == ["pine forest"]
+    assert matcher.replace("a Pine\tForest") == "a woods"
+
+
+def test_finditer_reports_spans():
+    matcher = KeywordMatcher({"lake": "water", "quiet lake": "still water"})
+    text = "a quiet lake and a lake"
+    assert list(matcher.finditer(text)) == [(2, 12, "quiet lake"), (19, 23, "lake")]
+
+
+def test_empty_mapping_matches_nothing():
+    matcher = KeywordMatcher({})
+    assert matcher.find_all("anything at all") == []
+    assert matcher.replace("anything") == "anything"
@@ -0,0 +1,30 @@
+import pytest
+from prompt_gate import PromptGate
+from prompt_parser import PromptParser
+
+
+@pytest.fixture(scope='module')
+def parser():
+    return PromptParser({'prompt_parser': {'warmup': False}})
+
+
+def reason(parser, text):
+    return PromptGate({}).check(parser.extract(text), record=False)[1]
+
+
+@pytest.mark.parametrize("text", [
+    "a blood moon over the desert",
+    "a blood red sunset",
+    "shooting stars over a quiet lake",
+])
+def test_landscape_words_are_not_blocked(parser, text):
+    assert reason(parser, text) is None
+
+
+@pytest.mark.parametrize("text", [
+    "a field covered in blood",
+    "a mass shooting in a park",
+    "a dead body in the woods",
+])
+def test_violent_phrases_are_blocked(parser, text):
+    assert reason(parser, text) == "blocked:violence"
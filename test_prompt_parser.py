@@ -0,0 +1,45 @@
+import pytest
+from prompt_parser import PromptParser
+
+
+@pytest.fixture(scope='module')
+def parser():
+    return PromptParser({'prompt_parser': {'warmup': False}})
+
+
+def subject_of(prompt):
+    return prompt[len("A cinematic landscape scene of "):prompt.index(", photorealistic")]
+
+
+@pytest.mark.parametrize("text, subject", [
+    ("a lighthouse on a cliff at sunset", "a lighthouse on a cliff at sunset"),
+    ("cherry blossoms along a river", "cherry blossoms along a river"),
+    ("a field of sunflowers", "a field of sunflowers"),
+    ("a forest with sunlight", "a forest with sunlight"),
+    ("a well in the desert", "a well in the desert"),
+])
+def test_words_outside_the_lexicons_are_kept(parser, text, subject):
+    assert subject_of(parser.parse(text)).startswith(subject)
+
+
+def test_noun_phrases_form_the_subject_when_they_cover_it(parser):
+    prompt = parser.parse("um, can you show me tall pine trees by a quiet lake at sunset")
+    assert subject_of(prompt).startswith("tall pine trees and quiet lake")
+    assert "fiery sunset sky" in prompt
+
+
+def test_modifier_in_subject_is_not_repeated(parser):
+    prompt = parser.parse("a red car")
+    assert subject_of(prompt) == "a red car"
+
+
+def test_leading_discourse_markers_are_dropped(parser):
+    assert parser.clean_text("so like, a calm lake") == "a calm lake"
+    assert parser.clean_text("a lake that looks like glass") == "a lake that looks like glass"
+
+
+def test_noun_phrases_group_modifiers_with_nouns(parser):
+    scene = parser.extract("tall pine trees by a quiet lake")
+    phrases, loose = parser.noun_phrases(scene)
+    assert phrases == ["tall pine trees", "quiet lake"]
+    assert loose == []
@@ -0,0 +1,75 @@
+import os
+from result_cache import ResultCache, cache_key, normalize
+
+
+def cache_config(tmp_path, **settings):
+    settings.setdefault('cache_file', str(tmp_path / 'result_cache.json'))
+    return {'result_cache': settings, 'queue_fsync': False}
+
+
+def clip(tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(b'')
+    return str(path)
+
+
+def test_normalize_drops_case_punctuation_and_fillers():
+    assert normalize("I'd like to see a Sunset, over the LAKE!") == "sunset over lake"
+    assert normalize("  um,   show me   mountains ") == "mountains"
+    assert normalize(None) == ""
+
+
+def test_equivalent_requests_share_a_key():
+    keys = {cache_key(normalize(text)) for text in [
+        "A sunset over the lake",
+        "sunset over lake",
+        "Show me a sunset over the lake, please.",
+    ]}
+    assert len(keys) == 1
+    assert cache_key(normalize("sunrise over lake")) not in keys
+
+
+def test_key_is_stable_hex():
+    key = cache_key("sunset over lake")
+    assert key == cache_key("sunset over lake")
+    assert len(key) == 32
+    int(key, 16)
+
+
+def test_lookup_uses_normalized_text(tmp_path):
+    cache = ResultCache(cache_config(tmp_path, similarity=0))
+    video = clip(tmp_path, 'a.mp4')
+    cache.store("A sunset over the lake", video)
+
+    assert cache.lookup("show me a SUNSET over the lake")["video_path"] == video
+    assert cache.lookup("a sunrise over the lake") is None
+    assert cache.lookup("um, please") is None
+
+
+def test_entries_survive_restart(tmp_path):
+    config = cache_config(tmp_path, similarity=0)
+    video = clip(tmp_path, 'a.mp4')
+    cache = ResultCache(config)
+    cache.store("pine forest in the snow", video)
+    cache.journal.close()
+
+    assert ResultCache(config).lookup("Pine forest in snow")["video_path"] == video
+
+
+def test_missing_clip_is_not_served(tmp_path):
+    cache = ResultCache(cache_config(tmp_path, similarity=0))
+    video = clip(tmp_path, 'a.mp4')
+    cache.store("pine forest", video)
+    os.remove(video)
+
+    assert cache.lookup("pine forest") is None
+    assert not cache.entries
+
+
+def test_opposite_scenes_miss_by_default(tmp_path):
+    cache = ResultCache(cache_config(tmp_path))
+    cache.store("a stormy ocean at night with lightning and huge waves", clip(tmp_path, 'storm.mp4'))
+    cache.store("tall pine trees at dusk", clip(tmp_path, 'dusk.mp4'))
+
+    assert cache.lookup("a calm ocean at night with lightning and huge waves") is None
+    assert cache.lookup("tall pine trees at dawn") is None
@@ -0,0 +1,75 @@
+import random
+from video_catalog import WeightTree
+
+
+def cumulative_find(weights, value):
+    """Reference linear scan for WeightTree.find"""
+    for index, weight in enumerate(weights):
+        if value < weight:
+            return index
+        value -= weight
+    return len(weights) - 1
+
+
+def test_find_maps_value_ranges_to_slots():
+    tree = WeightTree()
+    for weight in [1.0, 2.0, 3.0]:
+        tree.append(weight)
+
+    assert tree.total() == 6.0
+    assert [tree.find(value) for value in [0.0, 0.99, 1.0, 2.5, 3.0, 5.99]] == [0, 0, 1, 1, 2, 2]
+
+
+def test_find_skips_zero_weight_slots():
+    tree = WeightTree()
+    for weight in [0.0, 2.0, 0.0, 0.0, 1.0]:
+        tree.append(weight)
+
+    assert tree.find(0.0) == 1
+    assert tree.find(1.99) == 1
+    assert tree.find(2.0) == 4
+
+
+def test_find_follows_updates():
+    tree = WeightTree()
+    for _ in range(5):
+        tree.append(1.0)
+    tree.set(0, 0.0)
+    tree.set(3, 4.0)
+
+    assert tree.total() == 7.0
+    assert tree.find(0.5) == 1
+    assert tree.find(2.0) == 3
+    assert tree.find(5.99) == 3
+    assert tree.find(6.0) == 4
+
+
+def test_find_matches_linear_scan():
+    rng = random.Random(7)
+    tree = WeightTree()
+    weights = []
+    for size in range(1, 40):
+        weight = rng.choice([0.0, 0.5, 1.0, 3.0])
+        tree.append(weight)
+        weights.append(weight)
+        if rng.random() < 0.3:
+            index = rng.randrange(size)
+            weights[index] = rng.choice([0.0, 2.0])
+            tree.set(index, weights[index])
+
+        total = sum(weights)
+        assert abs(tree.total() - total) < 1e-9
+        if not total:
+            continue
+        for _ in range(20):
+            value = rng.random() * total
+            assert weights[tree.find(value)] > 0
+            assert tree.find(value) == cumulative_find(weights, value)
+
+
+def test_find_clamps_to_last_slot():
+    tree = WeightTree()
+    tree.append(1.0)
+    tree.append(1.0)
+    assert tree.find(2.0) == 1
+    assert tree.find(10.0) == 1
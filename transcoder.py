@@ -0,0 +1,130 @@
+import os
+import shutil
+import logging
+import tempfile
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+
+class Transcoder:
+    """
+    Normalizes downloaded clips for playback: one H.264 profile at the
+    projector's resolution and frame rate, with a seamless loop and a
+    thumbnail.
+
+    The loop seam is hidden by crossfading the clip's tail into its head.
+    For a clip of length D and a crossfade of X, [X, D] is faded into
+    [0, X] with xfade at offset D - 2X. The result is D - X long, and its
+    last frame runs into its first.
+
+    Each normalize() call runs ffmpeg as a child process, so the pipeline
+    stage calling it gets process-level parallelism from its workers.
+    """
+
+    def __init__(self, config=None):
+        settings = (config or {}).get('transcode', {})
+        self.enabled = settings.get('enabled', True)
+        self.width = settings.get('width', 1280)
+        self.height = settings.get('height', 768)
+        self.fps = settings.get('fps', 24)
+        self.crf = settings.get('crf', 20)
+        self.preset = settings.get('preset', 'veryfast')
+        self.crossfade = settings.get('crossfade_seconds', 1.0)
+        self.thumbnail_width = settings.get('thumbnail_width', 320)
+        self.keep_original = settings.get('keep_original', False)
+        self.timeout = settings.get('timeout', 180)
+        self.ffmpeg = settings.get('ffmpeg', 'ffmpeg')
+        self.ffprobe = settings.get('ffprobe', 'ffprobe')
+
+        if self.enabled and not (shutil.which(self.ffmpeg) and shutil.which(self.ffprobe)):
+            logger.warning("ffmpeg/ffprobe not found, clips will be queued as downloaded")
+            self.enabled = False
+
+    def normalize(self, source_path, output_path):
+        """
+        Transcode source_path to output_path. Returns {"path", "duration",
+        "thumbnail_path"} or None on failure. When disabled the source is
+        passed through unchanged with an unknown duration.
+        """
+        if not self.enabled:
+            return {"path": source_path, "duration": None, "thumbnail_path": None}
+
+        directory = os.path.dirname(os.path.abspath(output_path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".part_", suffix=".mp4")
+        os.close(fd)
+        try:
+            source_duration = self.probe_duration(source_path)
+            if not source_duration:
+                logger.error(f"Could not read the duration of {source_path}")
+                return None
+
+            crossfade = self.crossfade if source_duration >= 2 * self.crossfade + 0.5 else 0
+            self._run([
+                self.ffmpeg, '-y', '-loglevel', 'error', '-i', source_path,
+                '-filter_complex', self._filter(source_duration, crossfade),
+                '-map', '[out]', '-an',
+                '-c:v', 'libx264', '-preset', self.preset, '-crf', str(self.crf),
+                '-pix_fmt', 'yuv420p', '-g', str(self.fps * 2), '-movflags', '+faststart',
+                temp_path
+            ])
+            os.replace(temp_path, output_path)
+
+            duration = self.probe_duration(output_path) or source_duration - crossfade
+            thumbnail_path = self._thumbnail(output_path, duration)
+            if not self.keep_original and os.path.abspath(source_path) != os.path.abspath(output_path):
+                os.remove(source_path)
+            return {"path": output_path, "duration": duration, "thumbnail_path": thumbnail_path}
+
+        except Exception as e:
+            logger.error(f"Error normalizing {source_path}: {str(e)}")
+            return None
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def probe_duration(self, path):
+        """Container duration in seconds, or None"""
+        try:
+            output = self._run([
+                self.ffprobe, '-v', 'error', '-show_entries', 'format=duration',
+                '-of', 'default=noprint_wrappers=1:nokey=1', path
+            ])
+            return float(output.strip())
+        except Exception as e:
+            logger.warning(f"ffprobe failed for {path}: {str(e)}")
+            return None
+
+    def _filter(self, duration, crossfade):
+        profile = (
+            f"scale={self.width}:{self.height}:force_original_aspect_ratio=increase,"
+            f"crop={self.width}:{self.height},fps={self.fps},setsar=1,format=yuv420p"
+        )
+        if not crossfade:
+            return f"[0:v]{profile}[out]"
+        return (
+            f"[0:v]{profile},split[a][b];"
+            f"[a]trim=start={crossfade}:end={duration},setpts=PTS-STARTPTS[body];"
+            f"[b]trim=start=0:end={crossfade},setpts=PTS-STARTPTS[head];"
+            f"[body][head]xfade=transition=fade:duration={crossfade}:offset={duration - 2 * crossfade}[out]"
+        )
+
+    def _thumbnail(self, video_path, duration):
+        """JPEG of the middle frame, named after the clip's ID, or None"""
+        directory, name = os.path.split(video_path)
+        thumbnail_path = os.path.join(directory, name.split('.', 1)[0] + '.jpg')
+        try:
+            self._run([
+                self.ffmpeg, '-y', '-loglevel', 'error', '-ss', f"{duration / 2:.3f}", '-i', video_path,
+                '-frames:v', '1', '-vf', f"scale={self.thumbnail_width}:-2", thumbnail_path
+            ])
+            return thumbnail_path
+        except Exception as e:
+            logger.warning(f"Could not extract thumbnail from {video_path}: {str(e)}")
+            return None
+
+    def _run(self, command):
+        result = subprocess.run(command, capture_output=True, timeout=self.timeout)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.decode(errors='replace').strip() or f"{command[0]} failed")
+        return result.stdout.decode()
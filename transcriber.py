@@ -1,31 +1,50 @@
-import whisper
 import logging
 import os
+import time
+import numpy as np
+from transcription_backends import SAMPLE_RATE, create_backend
 
 logger = logging.getLogger(__name__)
 
 class Transcriber:
-    def __init__(self):
-        self.model = whisper.load_model("base")
+    def __init__(self, config=None):
+        config = config or {}
+        self.backend = create_backend(config)
+        self.backend.load()
+
+        # Pay the first-call overhead now rather than on the first visitor
+        if config.get('transcriber', {}).get('warmup', True):
+            self.warmup()
+
+        # Streaming: re-decode the uncommitted audio every step, and commit
+        # segments that two consecutive passes agree on and that end at
+        # least commit_margin seconds before the newest audio
+        self.stream_step = config.get('stream_step_seconds', 1.0)
+        self.stream_commit_margin = config.get('stream_commit_margin_seconds', 1.0)
+        self.stream_min_seconds = config.get('stream_min_seconds', 0.5)
         
-    def transcribe(self, audio_file):
+    def warmup(self):
+        """Run one inference on a second of silence"""
+        start = time.time()
+        try:
+            self.backend.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32))
+            logger.info(f"Transcriber warm-up took {time.time() - start:.2f}s")
+        except Exception as e:
+            logger.warning(f"Transcriber warm-up failed: {str(e)}")
+
+    def transcribe(self, audio):
         """
-        Transcribe audio file to text using Whisper
+        Transcribe audio to text using Whisper. Accepts a 16 kHz mono
+        float32 array, or the path of a temporary audio file which is
+        removed afterwards.
         """
         try:
-            if not os.path.exists(audio_file):
-                logger.error(f"Audio file not found: {audio_file}")
-                return None
-                
-            # Transcribe audio
-            result = self.model.transcribe(audio_file)
-            transcribed_text = result["text"].strip()
-            
-            # Clean up temporary audio file
-            try:
-                os.remove(audio_file)
-            except Exception as e:
-                logger.warning(f"Could not remove temporary audio file: {str(e)}")
+            if isinstance(audio, np.ndarray):
+                transcribed_text = self.backend.transcribe(audio)["text"]
+            else:
+                transcribed_text = self._transcribe_file(audio)
+                if transcribed_text is None:
+                    return None
             
             logger.info(f"Transcribed text: {transcribed_text}")
             return transcribed_text
@@ -33,3 +52,89 @@ class Transcriber:
         except Exception as e:
             logger.error(f"Error transcribing audio: {str(e)}")
             return None
+
+    def transcribe_stream(self, chunks, on_partial=None):
+        """
+        Transcribe 16 kHz float32 chunks while they are still arriving.
+
+        on_partial(text, stable_text) is called after every pass with the
+        current hypothesis and its committed prefix, which later passes
+        will not change. Returns the final text, or None if no audio came.
+        """
+        try:
+            buffer = np.zeros(0, dtype=np.float32)
+            committed = []
+            previous = []
+            received = 0
+            since_pass = 0
+            step = int(self.stream_step * SAMPLE_RATE)
+
+            for chunk in chunks:
+                buffer = np.concatenate([buffer, chunk])
+                received += len(chunk)
+                since_pass += len(chunk)
+                if since_pass < step or len(buffer) < self.stream_min_seconds * SAMPLE_RATE:
+                    continue
+                since_pass = 0
+
+                segments = self._segments(buffer)
+                horizon = len(buffer) / SAMPLE_RATE - self.stream_commit_margin
+
+                # Local agreement: commit the leading segments this pass shares
+                # with the previous one, then drop their audio from the buffer
+                stable = 0
+                for current, prior in zip(segments, previous):
+                    if current['text'] != prior['text'] or current['end'] > horizon:
+                        break
+                    stable += 1
+                if stable:
+                    committed.extend(s['text'] for s in segments[:stable])
+                    buffer = buffer[int(segments[stable - 1]['end'] * SAMPLE_RATE):]
+                    segments = segments[stable:]
+                previous = segments
+
+                if on_partial:
+                    stable_text = ' '.join(committed)
+                    partial = ' '.join(committed + [s['text'] for s in segments])
+                    on_partial(partial, stable_text)
+
+            if not received:
+                return None
+
+            # Only the uncommitted tail is left to decode after end-of-speech
+            start = time.time()
+            if len(buffer) >= self.stream_min_seconds * SAMPLE_RATE:
+                committed.extend(s['text'] for s in self._segments(buffer))
+            transcribed_text = ' '.join(committed).strip()
+            logger.info(f"Finalized transcript in {time.time() - start:.2f}s: {transcribed_text}")
+            return transcribed_text
+
+        except Exception as e:
+            logger.error(f"Error transcribing audio stream: {str(e)}")
+            return None
+
+    def _segments(self, audio):
+        """Decode audio and return its non-empty segments"""
+        result = self.backend.transcribe(audio, condition_on_previous_text=False)
+        segments = []
+        for segment in result.get("segments", []):
+            text = segment["text"].strip()
+            if text:
+                segments.append({"text": text, "end": segment["end"]})
+        return segments
+
+    def _transcribe_file(self, audio_file):
+        """Transcribe a temporary audio file and remove it"""
+        if not os.path.exists(audio_file):
+            logger.error(f"Audio file not found: {audio_file}")
+            return None
+
+        result = self.backend.transcribe(audio_file)
+
+        # Clean up temporary audio file
+        try:
+            os.remove(audio_file)
+        except Exception as e:
+            logger.warning(f"Could not remove temporary audio file: {str(e)}")
+
+        return result["text"].strip()
@@ -0,0 +1,149 @@
+import itertools
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+# Loaded models are kept for the life of the process, keyed by their settings
+_models = {}
+_models_lock = threading.Lock()
+
+
+class TranscriptionBackend:
+    """
+    Common interface for speech-to-text engines. transcribe() takes a
+    16 kHz mono float32 array or an audio file path and returns
+    {"text": str, "segments": [{"text", "start", "end"}, ...]}.
+    """
+
+    name = None
+
+    def __init__(self, config):
+        self.model_size = config.get('model_size', 'base')
+        self.device = config.get('device', 'cpu')
+        self.compute_type = config.get('compute_type', 'int8')
+        self.threads = config.get('threads', 0)
+        self.language = config.get('language')
+
+    def load(self):
+        """Return the model for these settings, loading it on first use"""
+        key = (self.name, self.model_size, self.device, self.compute_type, self.threads)
+        with _models_lock:
+            if key not in _models:
+                logger.info(f"Loading {self.name} model '{self.model_size}' on {self.device}")
+                _models[key] = self._load_model()
+            return _models[key]
+
+    def _load_model(self):
+        raise NotImplementedError
+
+    def transcribe(self, audio, condition_on_previous_text=True):
+        raise NotImplementedError
+
+
+class WhisperBackend(TranscriptionBackend):
+    """openai-whisper on PyTorch"""
+
+    name = 'whisper'
+
+    def _load_model(self):
+        import torch
+        import whisper
+
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        return whisper.load_model(self.model_size, device=self.device)
+
+    def transcribe(self, audio, condition_on_previous_text=True):
+        result = self.load().transcribe(
+            audio,
+            fp16=self.device != 'cpu',
+            language=self.language,
+            condition_on_previous_text=condition_on_previous_text
+        )
+        return {
+            "text": result["text"].strip(),
+            "segments": [
+                {"text": s["text"], "start": s["start"], "end": s["end"]}
+                for s in result.get("segments", [])
+            ]
+        }
+
+
+class FasterWhisperBackend(TranscriptionBackend):
+    """faster-whisper on CTranslate2, int8 quantized by default"""
+
+    name = 'faster-whisper'
+
+    def _load_model(self):
+        from faster_whisper import WhisperModel
+
+        return WhisperModel(
+            self.model_size,
+            device=self.device,
+            compute_type=self.compute_type,
+            cpu_threads=self.threads
+        )
+
+    def transcribe(self, audio, condition_on_previous_text=True):
+        segments, _ = self.load().transcribe(
+            audio,
+            language=self.language,
+            beam_size=1,
+            condition_on_previous_text=condition_on_previous_text
+        )
+        segments = [
+            {"text": s.text, "start": s.start, "end": s.end}
+            for s in segments
+        ]
+        return {
+            "text": "".join(s["text"] for s in segments).strip(),
+            "segments": segments
+        }
+
+
+class StubBackend(TranscriptionBackend):
+    """
+    Returns a fixed transcript, or the next of stub_texts on each call;
+    for tests, benchmarks and offline runs
+    """
+
+    name = 'stub'
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.text = config.get('stub_text', 'misty mountains at dusk')
+        self.texts = itertools.cycle(config.get('stub_texts') or [self.text])
+        self.lock = threading.Lock()
+
+    def _load_model(self):
+        return None
+
+    def transcribe(self, audio, condition_on_previous_text=True):
+        duration = len(audio) / SAMPLE_RATE if isinstance(audio, np.ndarray) else 0.0
+        if isinstance(audio, np.ndarray) and not np.any(audio):
+            return {"text": "", "segments": []}
+        with self.lock:
+            text = next(self.texts)
+        return {
+            "text": text,
+            "segments": [{"text": text, "start": 0.0, "end": duration}]
+        }
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (WhisperBackend, FasterWhisperBackend, StubBackend)
+}
+
+
+def create_backend(config):
+    """Create the backend named in the 'transcriber' config section"""
+    settings = config.get('transcriber', {})
+    name = settings.get('backend', 'whisper')
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown transcription backend: {name}")
+    return BACKENDS[name](settings)
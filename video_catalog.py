@@ -0,0 +1,257 @@
+import os
+import time
+import heapq
+import random
+import logging
+from collections import deque
+from threading import Lock
+from journal import Journal
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogEntry:
+    """Metadata for one generated clip"""
+
+    def __init__(self, path, prompt=None, image_path=None, duration=None,
+                 created_at=None, play_count=0, last_played=None, thumbnail_path=None):
+        self.path = path
+        self.prompt = prompt
+        self.image_path = image_path
+        self.duration = duration
+        self.thumbnail_path = thumbnail_path
+        self.created_at = created_at or time.time()
+        self.play_count = play_count
+        self.last_played = last_played
+        self.slot = None
+
+    def to_dict(self):
+        return {
+            "path": self.path,
+            "prompt": self.prompt,
+            "image_path": self.image_path,
+            "duration": self.duration,
+            "thumbnail_path": self.thumbnail_path,
+            "created_at": self.created_at,
+            "play_count": self.play_count,
+            "last_played": self.last_played
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class WeightTree:
+    """Fenwick tree of non-negative weights with O(log n) update and weighted sampling"""
+
+    def __init__(self):
+        self.weights = []
+        self.tree = [0.0]
+
+    def __len__(self):
+        return len(self.weights)
+
+    def append(self, weight=0.0):
+        """Add a slot and return its index"""
+        index = len(self.weights)
+        self.weights.append(0.0)
+        self.tree.append(0.0)
+        # Initialise the new node with the sum of the range it covers
+        node = index + 1
+        lowest = node - (node & -node)
+        child = node - 1
+        while child > lowest:
+            self.tree[node] += self.tree[child]
+            child -= child & -child
+        self.set(index, weight)
+        return index
+
+    def set(self, index, weight):
+        delta = weight - self.weights[index]
+        self.weights[index] = weight
+        node = index + 1
+        while node < len(self.tree):
+            self.tree[node] += delta
+            node += node & -node
+
+    def total(self):
+        total = 0.0
+        node = len(self.weights)
+        while node:
+            total += self.tree[node]
+            node -= node & -node
+        return total
+
+    def find(self, value):
+        """Index of the slot whose cumulative weight range contains value"""
+        node = 0
+        step = 1 << len(self.weights).bit_length()
+        while step:
+            child = node + step
+            if child < len(self.tree) and self.tree[child] <= value:
+                node = child
+                value -= self.tree[child]
+            step >>= 1
+        return min(node, len(self.weights) - 1)
+
+
+class VideoCatalog:
+    """
+    Every generated clip with its metadata, plus a scheduler that picks
+    what to replay when nothing new is queued. Unseen clips come first,
+    newest first; after that clips are drawn at random weighted towards
+    those played least, skipping the most recently played ones.
+    """
+
+    def __init__(self, config):
+        self.catalog_file = config.get('video_catalog_file', 'video_catalog.json')
+        self.cooldown_size = config.get('replay_cooldown', 5)
+        self.lock = Lock()
+
+        self.entries = {}
+        self.slots = []
+        self.free_slots = []
+        self.weights = WeightTree()
+        self.unseen = []
+        self.cooldown = deque()
+        self.journal = Journal(
+            self.catalog_file,
+            compact_every=config.get('catalog_compact_every', 500),
+            fsync=config.get('queue_fsync', True)
+        )
+        self._load_catalog()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, path):
+        return self.entries.get(path)
+
+    def add(self, path, **metadata):
+        """Record a newly generated clip"""
+        with self.lock:
+            entry = CatalogEntry(path, **metadata)
+            self._apply({"op": "add", "entry": entry.to_dict()})
+            return entry
+
+    def mark_played(self, path):
+        """Update play statistics once a clip has been shown"""
+        with self.lock:
+            if path in self.entries:
+                self._apply({"op": "played", "path": path, "at": time.time()})
+
+    def remove(self, path):
+        with self.lock:
+            if path in self.entries:
+                self._apply({"op": "remove", "path": path})
+
+    def next_video(self):
+        """Pick the next clip to show, or None if the catalog is empty"""
+        with self.lock:
+            # Bounded so a library of missing files can't spin forever
+            for _ in range(len(self.entries) + 1):
+                path = self._pick()
+                if path is None:
+                    return None
+                if os.path.exists(path):
+                    return path
+                logger.warning(f"Catalog video missing, dropping it: {path}")
+                self._apply({"op": "remove", "path": path})
+            return None
+
+    def _pick(self):
+        # Freshest unseen clip first
+        while self.unseen:
+            _, path = heapq.heappop(self.unseen)
+            entry = self.entries.get(path)
+            if entry is not None and entry.play_count == 0:
+                self._set_weight(entry)
+                return path
+
+        total = self.weights.total()
+        if total > 0:
+            index = self.weights.find(random.random() * total)
+            # Rounding can land on an empty slot at the very end of the range
+            if self.weights.weights[index] > 0:
+                return self.slots[index]
+
+        # Everything left is cooling down; take the one played longest ago
+        while self.cooldown:
+            path = self.cooldown.popleft()
+            if path in self.entries:
+                self._set_weight(self.entries[path])
+                return path
+        return None
+
+    def _set_weight(self, entry):
+        """Replay weight; clips shown fewer times are drawn more often"""
+        self.weights.set(entry.slot, 1.0 / (1 + entry.play_count))
+
+    def _apply(self, record, replay=False):
+        """Apply one change to the in-memory catalog and journal it"""
+        op = record["op"]
+        if op == "add":
+            self._insert(CatalogEntry.from_dict(record["entry"]))
+        elif op == "played" and record["path"] in self.entries:
+            entry = self.entries[record["path"]]
+            entry.play_count += 1
+            entry.last_played = record["at"]
+            # Recently played clips sit out of the replay draw for a while
+            self.weights.set(entry.slot, 0.0)
+            if entry.path in self.cooldown:
+                self.cooldown.remove(entry.path)
+            self.cooldown.append(entry.path)
+            while len(self.cooldown) > self.cooldown_size:
+                released = self.entries.get(self.cooldown.popleft())
+                if released is not None:
+                    self._set_weight(released)
+        elif op == "remove" and record["path"] in self.entries:
+            entry = self.entries.pop(record["path"])
+            self.weights.set(entry.slot, 0.0)
+            self.slots[entry.slot] = None
+            self.free_slots.append(entry.slot)
+            if entry.path in self.cooldown:
+                self.cooldown.remove(entry.path)
+
+        if not replay:
+            self.journal.append(record)
+            if self.journal.should_compact():
+                self._save_catalog()
+
+    def _insert(self, entry):
+        existing = self.entries.get(entry.path)
+        if existing is not None:
+            entry.slot = existing.slot
+        elif self.free_slots:
+            entry.slot = self.free_slots.pop()
+        else:
+            entry.slot = self.weights.append()
+            self.slots.append(None)
+        self.slots[entry.slot] = entry.path
+        self.entries[entry.path] = entry
+
+        if entry.play_count == 0:
+            self.weights.set(entry.slot, 0.0)
+            heapq.heappush(self.unseen, (-entry.created_at, entry.path))
+        else:
+            self._set_weight(entry)
+
+    def _load_catalog(self):
+        """Load the snapshot, replay the journal and compact"""
+        try:
+            snapshot, records = self.journal.load(default=[])
+            for data in snapshot or []:
+                self._insert(CatalogEntry.from_dict(data))
+            for record in records:
+                self._apply(record, replay=True)
+        except Exception as e:
+            logger.error(f"Error loading video catalog: {str(e)}")
+        self._save_catalog()
+
+    def _save_catalog(self):
+        """Write a compact snapshot of the catalog"""
+        try:
+            self.journal.compact([entry.to_dict() for entry in self.entries.values()])
+        except Exception as e:
+            logger.error(f"Error saving video catalog: {str(e)}")
@@ -1,11 +1,14 @@
 import os
-import time
-import json
 import base64
 import logging
 import random
-import requests
+from concurrent.futures import Future
 from dotenv import load_dotenv
+from http_client import get_client
+from runway_tasks import RunwayTaskManager
+from artifact_store import artifact_path, new_id
+from keyword_matcher import KeywordMatcher, load_vocabulary
+from metrics import get_metrics
 
 logger = logging.getLogger(__name__)
 load_dotenv()
@@ -14,46 +17,35 @@ RUNWAY_API = "https://api.dev.runwayml.com/v1"
 RUNWAY_VERSION = "2024-11-06"
 
 class VideoGenerator:
-    def __init__(self):
+    def __init__(self, config=None, on_recovered=None):
         self.api_key = os.getenv("RUNWAY_API_SECRET")
+        self.api_base = os.getenv("RUNWAY_API_BASE", RUNWAY_API)
         if not self.api_key:
             logger.error("No RUNWAY_API_SECRET found in environment variables")
         self.save_dir = os.getenv("SAVE_DIRECTORY", "./generated_videos")
+        self.duration = 5  # seconds per generated clip
         
-        # Motion mappings focused on internal motion only
-        self.motion_mappings = {
-            # Light Effects
-            'sunlight': [
-                'Completely static frame. Internal motion only: light beams gently shifting intensity, dust particles floating in light shafts, subtle air currents affecting light patterns',
-                'Fixed camera. Light dynamics: ethereal rays slowly intensifying and fading, floating particles catching light, gentle atmospheric movement',
-                'Locked frame. Light animation: beams of light gradually shifting, airborne particles drifting through light, delicate atmospheric effects'
-            ],
-            'forest': [
-                'Perfectly still camera. Internal forest motion: leaves gently swaying, light filtering through canopy, subtle shadow play on ground',
-                'Fixed position. Forest dynamics: foliage movement in light breeze, dappled light patterns shifting, gentle understory motion',
-                'Static frame. Woodland motion: branches swaying softly, light and shadow interplay, forest floor detail movement'
-            ],
-            'trees': [
-                'Absolutely fixed camera. Tree motion: leaves rustling in breeze, shifting light through branches, natural canopy movement',
-                'Locked position. Arboreal motion: foliage swaying gently, light patterns through leaves, branch and leaf interaction',
-                'Static shot. Tree dynamics: leaf movement in wind, light filtering effects, natural forest motion'
-            ],
-            'light': [
-                'Completely static view. Light effects: rays shifting intensity, atmospheric particles in beams, gentle light evolution',
-                'Fixed frame. Lighting dynamics: beam intensity variation, floating particles in light, subtle atmospheric movement',
-                'Locked camera. Light animation: soft ray movement, airborne particle effects, delicate light changes'
-            ],
-            
-            # Default nature motion
-            'default': [
-                'Absolutely static camera. Natural motion: subtle environmental movement, gentle atmospheric effects, soft light variation',
-                'Fixed frame. Environmental dynamics: delicate element motion, atmospheric flow, light interplay',
-                'Locked position. Scene motion: soft natural movement, light and shadow play, gentle atmospheric drift'
-            ]
-        }
+        # Motion mappings focused on internal motion only, from vocabulary.json;
+        # 'default' is used when no keyword matches
+        self.motion_mappings = load_vocabulary().get('motion', {})
+        self.motion_matcher = KeywordMatcher({
+            keyword: prompts for keyword, prompts in self.motion_mappings.items()
+            if keyword != 'default'
+        })
         
         os.makedirs(self.save_dir, exist_ok=True)
 
+        # Called with (video_path, meta) for videos from tasks nobody is
+        # waiting on any more
+        self.on_recovered = on_recovered
+        self.tasks = RunwayTaskManager(
+            self.api_base,
+            self._headers,
+            self._download_output,
+            config,
+            on_orphan=self._on_orphan_video
+        )
+
     def _get_motion_prompt(self, scene_description: str) -> str:
         """
         Generate motion prompt with absolutely static camera
@@ -67,13 +59,13 @@ class VideoGenerator:
         ]
         
         # Find matching environmental effects
-        matched_effects = []
-        for keyword, prompts in self.motion_mappings.items():
-            if keyword in scene_description:
-                matched_effects.append(random.choice(prompts))
+        matched_effects = [
+            random.choice(self.motion_matcher.values[keyword])
+            for keyword in self.motion_matcher.find_all(scene_description)
+        ]
         
         # If no specific effects found, use default nature motion
-        if not matched_effects:
+        if not matched_effects and self.motion_mappings.get('default'):
             matched_effects = [random.choice(self.motion_mappings['default'])]
         
         motion_elements.extend(matched_effects)
@@ -90,15 +82,33 @@ class VideoGenerator:
 
     def generate(self, image_path, scene_description):
         """Generate video from image using Runway API"""
+        future = self.submit(image_path, scene_description)
+        return future.result()
+
+    def submit(self, image_path, scene_description, meta=None):
+        """
+        Start generating a video without waiting for it. Returns a Future
+        that resolves to the saved video path, or None on failure.
+        """
         try:
             if not self.api_key:
                 logger.error("Cannot generate video: No Runway API key configured")
-                return None
+                return self._resolved(None)
                 
-            return self._generate_runway(image_path, scene_description)
+            return self._submit_runway(image_path, scene_description, meta)
         except Exception as e:
             logger.exception(f"Error generating video: {e}")
-            return None
+            return self._resolved(None)
+
+    def close(self):
+        """Stop polling; tasks still running are resumed from the journal next run"""
+        self.tasks.close()
+
+    @staticmethod
+    def _resolved(result):
+        future = Future()
+        future.set_result(result)
+        return future
 
     def _headers(self):
         """Get headers for Runway API requests"""
@@ -108,91 +118,47 @@ class VideoGenerator:
             "X-Runway-Version": RUNWAY_VERSION,
         }
 
-    def _generate_runway(self, image_path, scene_description):
-        """Generate video using Runway API with static camera"""
+    def _submit_runway(self, image_path, scene_description, meta=None):
+        """Submit an image_to_video task with static camera"""
+        # Build motion prompt
+        prompt_text = self._get_motion_prompt(scene_description)
+
+        # Encode image
+        with open(image_path, "rb") as f:
+            b64 = base64.b64encode(f.read()).decode("utf-8")
+        data_uri = f"data:image/png;base64,{b64}"
+
+        # Create task
+        payload = {
+            "model": "gen3a_turbo",
+            "promptImage": data_uri,
+            "promptText": prompt_text,
+            "duration": self.duration,
+            "ratio": "1280:768"
+        }
+
+        meta = dict(meta or {}, image_path=image_path, prompt=scene_description)
+        return self.tasks.submit(payload, meta)
+
+    def _download_output(self, outputs, meta):
+        """Download a finished task's video; runs on a worker thread"""
+        http = get_client()
+        video_url = outputs[0]
+        logger.info(f"Downloading video: {video_url}")
+
+        save_path = artifact_path(self.save_dir, meta.get("job_id") or new_id(), "mp4")
         try:
-            # Build motion prompt
-            prompt_text = self._get_motion_prompt(scene_description)
-
-            # Encode image
-            with open(image_path, "rb") as f:
-                b64 = base64.b64encode(f.read()).decode("utf-8")
-            data_uri = f"data:image/png;base64,{b64}"
-
-            # Create task
-            payload = {
-                "model": "gen3a_turbo",
-                "promptImage": data_uri,
-                "promptText": prompt_text,
-                "duration": 5,
-                "ratio": "1280:768"
-            }
-
-            logger.info("Submitting image_to_video task to Runway...")
-            r = requests.post(
-                f"{RUNWAY_API}/image_to_video",
-                headers=self._headers(),
-                json=payload,
-                timeout=60
-            )
-            
-            if r.status_code != 200:
-                logger.error(f"Runway create failed [{r.status_code}]: {r.text}")
-                return None
-
-            task_id = r.json().get("id")
-            if not task_id:
-                logger.error(f"No task id in response: {r.text}")
-                return None
-
-            # Poll for completion
-            logger.info(f"Task created: {task_id}. Polling for completion...")
-            backoff = 1.0
-            for _ in range(120):  # ~2 minutes max
-                tr = requests.get(
-                    f"{RUNWAY_API}/tasks/{task_id}",
-                    headers=self._headers(),
-                    timeout=30
-                )
-                
-                if tr.status_code != 200:
-                    logger.warning(f"Task poll failed [{tr.status_code}]: {tr.text}")
-                else:
-                    td = tr.json()
-                    status = td.get("status")
-                    
-                    if status == "SUCCEEDED":
-                        outputs = td.get("output") or []
-                        if not outputs:
-                            logger.error(f"Task succeeded but no outputs: {json.dumps(td)[:500]}")
-                            return None
-                            
-                        video_url = outputs[0]
-                        logger.info(f"Downloading video: {video_url}")
-                        vr = requests.get(video_url, timeout=120)
-                        
-                        if vr.status_code != 200:
-                            logger.error(f"Video download failed [{vr.status_code}]")
-                            return None
-                            
-                        save_path = os.path.join(self.save_dir, f"generated_{len(os.listdir(self.save_dir))}.mp4")
-                        with open(save_path, "wb") as f:
-                            f.write(vr.content)
-                            
-                        logger.info("Successfully generated video.")
-                        return save_path
-                        
-                    elif status in {"FAILED", "CANCELED", "CANCELLED"}:
-                        logger.error(f"Runway task ended with status: {status}")
-                        return None
-                    
-                time.sleep(backoff)
-                backoff = min(backoff * 1.5, 5.0)
-
-            logger.error("Timed out waiting for Runway task to finish.")
-            return None
-            
+            with get_metrics().span('runway_download', meta.get("job_id")) as span:
+                span['bytes'] = http.download(video_url, save_path, timeout=(http.connect_timeout, 120))
         except Exception as e:
-            logger.error(f"Error with Runway API: {str(e)}")
-            logger.exception("Full traceback:")
+            logger.error(f"Video download failed: {str(e)}")
             return None
+
+        logger.info("Successfully generated video.")
+        return save_path
+
+    def _on_orphan_video(self, video_path, meta):
+        """A task finished after its caller stopped waiting, or after a restart"""
+        logger.info(f"Recovered video from an earlier Runway task: {video_path}")
+        if self.on_recovered:
+            self.on_recovered(video_path, meta)
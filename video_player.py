@@ -1,18 +1,40 @@
-import vlc
-import pygame
 import logging
 import threading
 import time
 import os
+import queue
+from collections import deque
+from frame_player import FramePlayer
+from artifact_store import artifact_id, id_time
+from metrics import get_metrics
 
 logger = logging.getLogger(__name__)
 
 class VideoPlayer:
-    def __init__(self, config):
+    def __init__(self, config, queue_manager=None):
         self.config = config
         self.running = False
+        self.thread = None
         self.current_video = None
         self.display_output = config.get('display_output', ':1')
+
+        # Playback thread wakes on these instead of polling the player
+        self.events = queue.Queue()
+        self.playing_video = None
+        self.repeating = False
+        self.media_paths = {}
+        # The media list only grows; it is rebuilt after this many clips
+        self.max_list_length = config.get('player_max_list_length', 200)
+
+        # With a queue manager the player pulls clips itself and is woken
+        # when one is added; replays are cut short for a new clip
+        self.queue_manager = queue_manager
+        self.playing_fresh = False
+        self.interrupt_replays = config.get('interrupt_replays', True)
+        self.max_display_latency = config.get('max_display_latency', 30)
+        self.display_latencies = deque(maxlen=100)
+        if queue_manager is not None:
+            queue_manager.subscribe(lambda video_path: self.events.put('new_video'))
         
         # Initialize either VLC or Pygame
         try:
@@ -21,13 +43,19 @@ class VideoPlayer:
             logger.info("Using VLC for video playback")
         except Exception as e:
             logger.warning(f"Failed to initialize VLC: {str(e)}")
-            self.player = self._init_pygame()
+            # SDL wants the display created, flipped and pumped on one
+            # thread, so the pygame window is opened by the playback thread
+            self.player = None
+            self.frame_player = None
             self.using_vlc = False
             logger.info("Using Pygame for video playback")
 
     def _init_vlc(self):
         """Initialize VLC player"""
-        instance = vlc.Instance()
+        import vlc
+
+        self.vlc = vlc
+        instance = vlc.Instance('--no-video-title-show', '--no-osd')
         player = instance.media_player_new()
         
         # Set fullscreen
@@ -36,11 +64,40 @@ class VideoPlayer:
         # Set output display if specified
         if self.display_output:
             player.set_xwindow(int(self.display_output.replace(':', '')))
+
+        # A list player moves to the next (already parsed) clip itself,
+        # without a round trip through this thread between clips
+        self.list_player = instance.media_list_player_new()
+        self.list_player.set_media_player(player)
+        self.media_list = None
+
+        # libVLC callbacks run on VLC threads and must not call back into
+        # libVLC, so they only hand an event to the playback thread
+        list_events = self.list_player.event_manager()
+        list_events.event_attach(
+            vlc.EventType.MediaListPlayerNextItemSet,
+            lambda event: self.events.put('started')
+        )
+        list_events.event_attach(
+            vlc.EventType.MediaListPlayerPlayed,
+            lambda event: self.events.put('finished')
+        )
+        player_events = player.event_manager()
+        player_events.event_attach(
+            vlc.EventType.MediaPlayerEndReached,
+            lambda event: self.events.put('ended')
+        )
+        player_events.event_attach(
+            vlc.EventType.MediaPlayerEncounteredError,
+            lambda event: self.events.put('error')
+        )
             
         return player
 
     def _init_pygame(self):
         """Initialize Pygame player as fallback"""
+        import pygame
+
         pygame.init()
         pygame.display.init()
         
@@ -54,6 +111,8 @@ class VideoPlayer:
 
     def start(self):
         """Start video playback in a separate thread"""
+        if self.running:
+            return
         self.running = True
         self.thread = threading.Thread(target=self._playback_loop)
         self.thread.daemon = True
@@ -62,12 +121,34 @@ class VideoPlayer:
     def stop(self):
         """Stop video playback"""
         self.running = False
+        self.events.put('stop')
         if self.thread:
             self.thread.join()
         self._cleanup()
 
     def _playback_loop(self):
         """Main playback loop"""
+        if not self.using_vlc:
+            try:
+                self.player = self._init_pygame()
+                self.frame_player = FramePlayer(
+                    self.player,
+                    buffer_frames=self.config.get('player_buffer_frames', 8)
+                )
+            except Exception as e:
+                logger.error(f"Failed to initialize Pygame: {str(e)}")
+                self.running = False
+                return
+
+        try:
+            self._run_playback()
+        finally:
+            if not self.using_vlc:
+                import pygame
+
+                pygame.quit()
+
+    def _run_playback(self):
         while self.running:
             try:
                 if self.using_vlc:
@@ -79,35 +160,182 @@ class VideoPlayer:
                 time.sleep(1)
 
     def _vlc_playback(self):
-        """Handle VLC playback"""
+        """Handle VLC playback until the media list runs out"""
+        video_path = self._wait_for_video()
+        if video_path is None:
+            return
+
+        self.media_paths = {}
+        self.media_list = self.player.get_instance().media_list_new()
+        self.media_list.add_media(self._vlc_media(video_path))
+        self.list_player.set_media_list(self.media_list)
+        self.list_player.set_playback_mode(self.vlc.PlaybackMode.default)
+        self.repeating = False
+        self.list_player.play()
+
+        while self.running:
+            event = self.events.get()
+            if event == 'started':
+                self._on_vlc_clip_started()
+            elif event == 'new_video':
+                self._on_vlc_new_video()
+            elif event in ('finished', 'error', 'stop'):
+                # Start over with a fresh list on the next pass
+                return
+
+    def _on_vlc_clip_started(self):
+        """A clip is on screen: preload its successor or loop it"""
+        media = self.player.get_media()
+        previous = self.playing_video
+        self.playing_video = self.media_paths.get(media.get_mrl()) if media else None
+        if not (self.repeating and self.playing_video == previous):
+            self._clip_started(self.playing_video)
+
+        if self.media_list.count() >= self.max_list_length:
+            # Let the list end; _vlc_playback then builds a new one
+            self.list_player.set_playback_mode(self.vlc.PlaybackMode.default)
+            self.repeating = False
+            return
+
+        next_video = self._next_clip()
+        if next_video is None or next_video == self.playing_video:
+            # Nothing new to show: loop the current clip seamlessly
+            self.list_player.set_playback_mode(self.vlc.PlaybackMode.repeat)
+            self.repeating = True
+        else:
+            media = self._vlc_append(next_video)
+            if self._should_interrupt() and self.queue_manager.is_queued(next_video):
+                # Queued while a fresh clip played, when new_video was
+                # ignored; don't make it wait out this replay too
+                self.list_player.play_item(media)
+
+    def _on_vlc_new_video(self):
+        """A new clip arrived: follow a looping clip with it, or cut a replay short"""
+        interrupt = self._should_interrupt()
+        if not self.repeating and not interrupt:
+            return
+        next_video = self._next_clip()
+        if next_video is None or next_video == self.playing_video:
+            return
+        media = self._vlc_append(next_video)
+        if interrupt:
+            self.list_player.play_item(media)
+
+    def _vlc_append(self, video_path):
+        """Queue a clip after the current one and leave loop mode"""
+        media = self._vlc_media(video_path)
+        self.media_list.lock()
+        try:
+            self.media_list.add_media(media)
+        finally:
+            self.media_list.unlock()
+        self.list_player.set_playback_mode(self.vlc.PlaybackMode.default)
+        self.repeating = False
+        return media
+
+    def _vlc_media(self, video_path):
+        """Create media and start parsing it in the background"""
+        media = self.player.get_instance().media_new(video_path)
+        media.parse_with_options(self.vlc.MediaParseFlag.local, 0)
+        self.media_paths[media.get_mrl()] = video_path
+        return media
+
+    def _wait_for_video(self):
+        """Block until there is something to play"""
+        while self.running:
+            video_path = self._next_clip()
+            if video_path is not None:
+                return video_path
+            if self.using_vlc:
+                self.events.get()
+                continue
+            # Keep the pygame window responsive while idle
+            try:
+                self.events.get(timeout=0.1)
+            except queue.Empty:
+                import pygame
+
+                pygame.event.pump()
+        return None
+
+    def _next_clip(self):
+        """The clip that should follow the one playing now"""
+        if self.queue_manager is not None:
+            return self.queue_manager.get_next_video()
         if self.current_video and os.path.exists(self.current_video):
-            media = self.player.get_instance().media_new(self.current_video)
-            self.player.set_media(media)
-            self.player.play()
-            
-            # Wait for video to finish
-            time.sleep(1)  # Give time for video to start
-            while self.running and self.player.is_playing():
-                time.sleep(0.1)
+            return self.current_video
+        return None
+
+    def _should_interrupt(self):
+        """Whether a newly queued clip should replace the current one right away"""
+        return (
+            self.interrupt_replays
+            and self.queue_manager is not None
+            and not self.playing_fresh
+        )
+
+    def _clip_started(self, video_path):
+        """Record a clip reaching the screen and how long it took to get there"""
+        self.playing_fresh = False
+        if self.queue_manager is None or video_path is None:
+            return
+        latency = self.queue_manager.video_started(video_path)
+        if latency is None:
+            return
+        self.playing_fresh = True
+        self.display_latencies.append(latency)
+
+        # File names carry the job ID, which encodes when the visitor finished speaking
+        job_id = artifact_id(video_path)
+        metrics = get_metrics()
+        metrics.observe('fov_display_latency_seconds', latency)
+        if job_id:
+            metrics.observe('fov_time_to_screen_seconds', time.time() - id_time(job_id))
+        metrics.event('first_display', job_id, path=video_path, queued_seconds=round(latency, 3))
+        logger.info(f"New video on screen {latency:.1f}s after it was queued: {video_path}")
+        if latency > self.max_display_latency:
+            logger.warning(f"Video took longer than {self.max_display_latency}s to reach the screen")
 
     def _pygame_playback(self):
-        """Handle Pygame playback (fallback)"""
-        if self.current_video and os.path.exists(self.current_video):
+        """Handle Pygame playback (fallback): decode frames with OpenCV and blit them"""
+        video_path = self._wait_for_video()
+        if video_path is None:
+            return
+
+        self._clip_started(video_path)
+        if self.frame_player.play(video_path, should_stop=self._pygame_should_stop) is None:
+            # Unplayable file; don't spin on it
+            time.sleep(1)
+
+    def _pygame_should_stop(self):
+        """Checked every frame: stop for shutdown or to cut a replay short"""
+        if not self.running:
+            return True
+        interrupt = False
+        while True:
             try:
-                # This is a simplified version - in reality you'd need
-                # to properly decode and play video frames
-                pass
-            except Exception as e:
-                logger.error(f"Pygame playback error: {str(e)}")
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if event == 'new_video' and self._should_interrupt():
+                interrupt = True
+        return interrupt
+
+    def frame_stats(self):
+        """Decode/present timings of the pygame engine, or None when using VLC"""
+        if self.using_vlc or self.frame_player is None:
+            return None
+        return self.frame_player.timings.snapshot()
 
     def set_video(self, video_path):
         """Set the current video to play"""
         self.current_video = video_path
+        self.events.put('new_video')
 
     def _cleanup(self):
         """Clean up resources"""
+        # The pygame window is closed by the playback thread
         if self.using_vlc:
-            self.player.stop()
+            self.list_player.stop()
+            self.list_player.release()
             self.player.release()
-        else:
-            pygame.quit()